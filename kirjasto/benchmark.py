@@ -0,0 +1,209 @@
+# Benchmarks of the BookRepository on seeded synthetic libraries
+# Builds a library of each size into a temporary database, times the main repository calls and writes
+# the results as JSON, so the numbers of two runs can be compared
+# Example: python benchmark.py --sizes 10000 100000 --output new.json --compare old.json
+
+# Imports
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+from itertools import islice
+from book import Book
+from repo import BookRepository
+
+# Genres and how common they are
+GENRES = {"Fantasy": 18, "Scifi": 14, "Crime": 16, "Romance": 12, "Literature": 14,
+          "History": 8, "Biography": 6, "Horror": 5, "Poetry": 2, "Comics": 5}
+
+# Last day of the generated dates, fixed so that a seed gives the same library on any day
+END_DATE = date(2025, 12, 31)
+
+# Syllables for made up names and title words
+SYLLABLES = ["ka", "lo", "mi", "ra", "te", "su", "vin", "hel", "ar", "no", "pe", "tor", "el", "ja", "ko", "sa"]
+
+
+# Makes a word of a few syllables
+def make_word(rng, syllables=(2, 4)):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(*syllables))).capitalize()
+
+# Yields count books from the seed, the same seed gives the same books
+# Authors follow a Zipf like distribution so that a few write many of the books, like in a real library.
+# About half of the books are read, finished on a date between the added date and END_DATE
+def generate_books(count, seed=0):
+    rng = random.Random(seed)
+    author_count = max(10, count // 8)
+    authors = [f"{make_word(rng)} {make_word(rng, (2, 3))}" for _ in range(author_count)]
+    author_weights = [1 / (rank + 1) for rank in range(author_count)]
+    genres = list(GENRES)
+    genre_weights = list(GENRES.values())
+    words = [make_word(rng) for _ in range(2000)]
+
+    today = END_DATE
+    first_day = today - timedelta(days=365 * 15)
+    picked_authors = rng.choices(authors, author_weights, k=count)
+    picked_genres = rng.choices(genres, genre_weights, k=count)
+
+    for i in range(count):
+        pages = max(40, int(rng.gauss(330, 120)))
+        added = first_day + timedelta(days=rng.randrange((today - first_day).days))
+        roll = rng.random()
+        if roll < 0.5:
+            finished = added + timedelta(days=rng.randrange((today - added).days + 1))
+            status, current_page, rating = "READ", pages, rng.randint(1, 10)
+            finished = finished.isoformat()
+        elif roll < 0.6:
+            finished, status, current_page, rating = None, "READING", rng.randrange(1, pages), None
+        else:
+            finished, status, current_page, rating = None, "UNREAD", 0, None
+
+        yield Book(title=" ".join(rng.choice(words) for _ in range(rng.randint(1, 4))),
+                   author=picked_authors[i],
+                   pages=pages,
+                   genre=picked_genres[i],
+                   status=status,
+                   current_page=current_page,
+                   date_added=added.isoformat(),
+                   date_finished=finished,
+                   owned=rng.random() < 0.7,
+                   rating=rating)
+
+
+# Best time of repeat runs of the function in seconds
+# setup is run before each run outside of the timing and its result is given to the function
+def best_time(function, repeat, setup=None):
+    best = None
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# Builds a library of the size and times the repository calls on it
+# Returns {name of the measurement: seconds}
+def benchmark_size(size, seed=0, repeat=3, single_adds=200):
+    timings = {}
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, "bench.db")
+        repo = BookRepository(db_path)
+
+        # Bulk insert of the whole library, the books are made while they are inserted so the library is
+        # never in memory. Making them is timed on its own and left out of the insert time
+        start = time.perf_counter()
+        for _ in generate_books(size, seed):
+            pass
+        generate_time = time.perf_counter() - start
+        start = time.perf_counter()
+        repo.add_books(generate_books(size, seed))
+        timings["add_books_total"] = time.perf_counter() - start - generate_time
+        timings["add_books_per_book"] = timings["add_books_total"] / size
+
+        # Single inserts with a commit each, the way the GUI adds books
+        extra = list(generate_books(single_adds, seed + 1))
+        start = time.perf_counter()
+        for book in extra:
+            repo.add_book(book)
+        timings["add_book_per_book"] = (time.perf_counter() - start) / single_adds
+
+        # Searches with words that exist in the library, taken from the book in the middle
+        sample = next(islice(generate_books(size, seed), size // 2, None))
+        searches = {"search_title_prefix": {"title": sample.title.split()[0][:3]},
+                    "search_author": {"author": sample.author.split()[0]},
+                    "search_genre": {"genre": sample.genre}}
+        for name, filters in searches.items():
+            timings[name] = best_time(lambda: repo.search(**filters), repeat)
+
+        # First page of the list the GUI shows, and a page from the middle of the library
+        timings["search_page"] = best_time(lambda: repo.search_page(limit=200), repeat)
+        # The new database gave the books the ids 1 to size in the order they were made
+        middle = size // 2 + 1
+        timings["search_page_middle"] = best_time(lambda: repo.search_page(limit=200, after=middle), repeat)
+
+        # Stats without and with the cache
+        def cold_stats():
+            repo.clear_cache()
+            repo.get_stats()
+        timings["get_stats_cold"] = best_time(cold_stats, repeat)
+        timings["get_stats_cached"] = best_time(repo.get_stats, repeat)
+
+        # Yearly stats of one year and of the last ten years with one query
+        this_year = END_DATE.year
+        def cold_yearly():
+            repo.clear_cache()
+            repo.yearly_summary(this_year - 1)
+        def cold_ten_years():
+            repo.clear_cache()
+            repo.summary_by_year(range(this_year - 9, this_year + 1))
+        timings["yearly_summary_cold"] = best_time(cold_yearly, repeat)
+        timings["summary_by_year_10_cold"] = best_time(cold_ten_years, repeat)
+
+        # Loading the full list as Book objects and streaming only a couple of columns
+        # Each load is made on a new repository, so that every row is made into a new Book instead of
+        # refreshing the books that the identity map of an earlier load still has
+        fresh_repos = []
+        def fresh_repo():
+            fresh_repos.append(BookRepository(db_path))
+            return fresh_repos[-1]
+        timings["get_all_books"] = best_time(lambda fresh: fresh.get_all_books(), repeat, setup=fresh_repo)
+        timings["iter_books_columns"] = best_time(
+            lambda: sum(row[0] for row in repo.iter_books(columns=("pages",))), repeat)
+
+        for fresh in fresh_repos:
+            fresh.close()
+        repo.close()
+    return timings
+
+# Runs the benchmark for each size and returns the results with the details of the machine
+def run_benchmark(sizes, seed=0, repeat=3):
+    results = {"seed": seed,
+               "repeat": repeat,
+               "python": platform.python_version(),
+               "sqlite": sqlite3.sqlite_version,
+               "platform": platform.platform(),
+               "sizes": {}}
+    for size in sizes:
+        print(f"Benchmarking {size} books...")
+        results["sizes"][str(size)] = benchmark_size(size, seed, repeat)
+    return results
+
+# Prints the timings, and the change from an earlier run when there is one
+def print_results(results, old=None):
+    for size, timings in results["sizes"].items():
+        print(f"--- {size} books ---")
+        old_timings = (old or {}).get("sizes", {}).get(size, {})
+        for name, seconds in timings.items():
+            line = f"{name}: {seconds * 1000:.3f} ms"
+            if old_timings.get(name):
+                line += f" ({seconds / old_timings[name]:.2f}x of the old run)"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the BookRepository on seeded synthetic libraries")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="numbers of books")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated books")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each timing, the best one is kept")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.seed, args.repeat)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    old = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+    print_results(results, old)
+
+
+if __name__ == "__main__":
+    main()
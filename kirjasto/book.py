@@ -4,6 +4,13 @@ class Book:
     # Contains book objects that:
     # Mark as read/unread
     # Contains information: Title, Author, Length, Genre
+
+    # Fixed set of attributes, the objects have no __dict__ so a big list of books takes much less memory
+    # __weakref__ lets the repository keep the loaded books in its identity map
+    FIELDS = ("id", "title", "author", "pages", "current_page", "status", "genre",
+              "owned", "date_added", "date_finished", "rating")
+    __slots__ = FIELDS + ("__weakref__",)
+
     def __init__(self, title, author, pages, genre, status="UNREAD", current_page=0, date_added=None, date_finished=None, owned=True, id=None, rating=None):
         self.title = title                          # book title, string
         self.author = author                        # book author, string
@@ -50,6 +57,17 @@ class Book:
     def mark_unread(self):
         self.status = "UNREAD"
 
+    # Copies the values of another object of the same book
+    def copy_from(self, other):
+        for name in self.FIELDS:
+            setattr(self, name, getattr(other, name))
+
+    # New object with the same values, edited instead of the object that the repository has loaded
+    def copy(self):
+        other = Book.__new__(Book)
+        other.copy_from(self)
+        return other
+
     # Formats the book title, author, genre, page count, status and rating
     def __str__(self):
         progress = f"{self.current_page}/{self.pages}"
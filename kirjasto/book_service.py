@@ -0,0 +1,158 @@
+# Imports
+import sqlite3
+import threading
+from itertools import count
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+from book import Book
+from repo import BookRepository
+
+# Copies of the books in a value, lists, tuples and dictionaries are copied with them
+# Books that go between the threads are copied, so the identity map of the worker and the books of the
+# GUI never share an object that one thread changes while the other reads it
+def detach(value):
+    if isinstance(value, Book):
+        return value.copy()
+    if isinstance(value, (list, tuple)):
+        return type(value)(detach(item) for item in value)
+    if isinstance(value, dict):
+        return {name: detach(item) for name, item in value.items()}
+    return value
+
+# Runs the repository calls on its own thread with its own database connection
+# Lives on the thread of the service, so its slots are run there one call at a time
+class RepositoryWorker(QObject):
+    finished = Signal(int, object) # job id, result of the call
+    failed = Signal(int, str)      # job id, error message
+    cancelled = Signal(int)        # job id of a call that a newer one replaced
+    changed = Signal(object)       # changed ids and copies of the updated books after a saved write
+
+    def __init__(self, db_path, service, instrument=False):
+        super().__init__()
+        self.db_path = db_path
+        self.instrument = instrument
+        self.service = service
+        self.repo = None
+        self.running = None # (key, job id) of the call running right now
+
+    # The connection is opened on the worker thread, sqlite connections can only be used by the thread that made them
+    @Slot()
+    def open(self):
+        self.repo = BookRepository(self.db_path, instrument=self.instrument)
+        self.repo.subscribe(self.send_changes)
+
+    # Sends the changes of a saved write with copies of the updated books, so the GUI can refresh its own objects
+    def send_changes(self, changes):
+        books = self.repo.loaded_books(changes["updated"])
+        self.changed.emit(dict(changes, books=detach(books)))
+
+    # Runs one repository method, calls that a newer call with the same key replaced are skipped
+    @Slot(int, object, str, object, object)
+    def run(self, job_id, key, method, args, kwargs):
+        with self.service.lock:
+            if key is not None and self.service.latest.get(key) != job_id:
+                self.cancelled.emit(job_id)
+                return
+            self.running = (key, job_id)
+
+        try:
+            result = getattr(self.repo, method)(*args, **kwargs)
+        except sqlite3.OperationalError as error:
+            # Replaced while it was running, the service interrupted the query
+            if key is not None and self.service.latest.get(key) != job_id:
+                self.cancelled.emit(job_id)
+                return
+            self.failed.emit(job_id, str(error))
+            return
+        except Exception as error:
+            self.failed.emit(job_id, str(error))
+            return
+        finally:
+            with self.service.lock:
+                self.running = None
+
+        self.finished.emit(job_id, detach(result))
+
+    # Closes the connection and stops the thread
+    @Slot()
+    def close(self):
+        if self.repo is not None:
+            self.repo.close()
+        self.thread().quit()
+
+# Gives the GUI access to the repository without blocking the window
+# Every call goes to the worker thread and its callback is run on the GUI thread when the result comes back.
+# When the call fails its error callback gets the message instead and database_error is sent for the window
+# Calls with a key replace the earlier calls with the same key: a new search cancels the search that is
+# waiting or still running, so only the results of the latest search come back
+# books_changed sends the changes of every saved write,
+# {"added": ids, "updated": ids, "deleted": ids, "reset": bool, "books": copies of the updated books}
+# Books in the arguments and the results are copies, the GUI never gets the objects of the worker thread
+class BookService(QObject):
+    submit = Signal(int, object, str, object, object)
+    close_requested = Signal()
+    books_changed = Signal(object)
+    database_error = Signal(str)
+
+    # instrument=True turns on the query timing of the repository, the report comes from call("query_report")
+    def __init__(self, db_path, instrument=False):
+        super().__init__()
+        self.instrument = instrument
+        self.lock = threading.Lock()
+        self.latest = {}    # key -> id of the newest call with that key
+        self.callbacks = {} # job id -> (callback, error callback, key)
+        self.job_ids = count(1)
+
+        self.db_thread = QThread()
+        self.worker = RepositoryWorker(db_path, self, instrument)
+        self.worker.moveToThread(self.db_thread)
+        self.db_thread.started.connect(self.worker.open)
+        self.submit.connect(self.worker.run)
+        self.close_requested.connect(self.worker.close)
+        self.worker.finished.connect(self._finished)
+        self.worker.failed.connect(self._failed)
+        self.worker.cancelled.connect(self._cancelled)
+        self.worker.changed.connect(self.books_changed)
+        self.db_thread.start()
+
+    # Calls the repository method on the worker thread, callback gets the result on the GUI thread
+    # and error gets the message if the call fails. Returns the id of the call
+    def call(self, method, *args, callback=None, error=None, key=None, **kwargs):
+        job_id = next(self.job_ids)
+        if key is not None:
+            self._supersede(key, job_id)
+        self.callbacks[job_id] = (callback, error, key)
+        self.submit.emit(job_id, key, method, detach(args), detach(kwargs))
+        return job_id
+
+    # Makes the call the newest one of its key and interrupts the older call if it is running
+    def _supersede(self, key, job_id):
+        with self.lock:
+            self.latest[key] = job_id
+            running = self.worker.running
+            if running is not None and running[0] == key:
+                self.worker.repo.connect.interrupt()
+
+    # Result came back, the callback is run only if no newer call with the same key was made
+    def _finished(self, job_id, result):
+        callback, _, key = self.callbacks.pop(job_id, (None, None, None))
+        if key is not None and self.latest.get(key) != job_id:
+            return
+        if callback is not None:
+            callback(result)
+
+    # Call failed, the error callback lets the caller try again and the window shows the message
+    def _failed(self, job_id, message):
+        _, error, key = self.callbacks.pop(job_id, (None, None, None))
+        if key is not None and self.latest.get(key) != job_id:
+            return
+        if error is not None:
+            error(message)
+        self.database_error.emit(message)
+
+    def _cancelled(self, job_id):
+        self.callbacks.pop(job_id, None)
+
+    # Stops the worker thread after the calls already sent have run
+    def close(self):
+        self.close_requested.emit()
+        self.db_thread.wait()
@@ -0,0 +1,180 @@
+# Imports
+import csv
+import json
+from pathlib import Path
+from book import Book
+
+# Columns written by export_books, the same names are read back by record_to_book
+EXPORT_COLUMNS = ("title", "author", "pages", "genre", "status", "current_page",
+                  "date_added", "date_finished", "owned", "rating")
+
+# File types that import_books reads and export_books writes
+FILE_TYPES = (".csv", ".json", ".jsonl", ".ndjson")
+
+# Goodreads shelves and the matching book statuses
+GOODREADS_SHELVES = {"read": "READ",
+                     "currently-reading": "READING",
+                     "to-read": "UNREAD"}
+
+# Imports books from a CSV or JSON file into the repository
+# The file is read a piece at a time and the books are added chunk_size at a time, so the whole
+# file is never in memory. Everything goes in as one transaction, so a failed import adds nothing.
+# A big import is sent to the listeners as a reset instead of a list of every added id
+# Works with Goodreads CSV exports and with files that use the column names of the books table
+# Returns the number of imported books
+def import_books(repo, path, chunk_size=1000):
+    count = 0
+    chunk = []
+    with repo.transaction():
+        for record in read_records(path):
+            chunk.append(record_to_book(record))
+            if len(chunk) >= chunk_size:
+                repo.add_books(chunk)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            repo.add_books(chunk)
+            count += len(chunk)
+    return count
+
+# Writes every book of the repository to a CSV, JSON or JSON lines file, chosen by the file extension
+# The books are streamed from the database, so the whole library is never in memory
+# Returns the number of exported books
+def export_books(repo, path):
+    path = Path(path)
+    suffix = path.suffix.lower()
+    rows = repo.iter_books(columns=EXPORT_COLUMNS)
+    count = 0
+    if suffix == ".csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for row in rows:
+                writer.writerow(tuple(row))
+                count += 1
+    elif suffix in (".jsonl", ".ndjson"):
+        with open(path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n")
+                count += 1
+    elif suffix == ".json":
+        # One array with an object on each line, written a book at a time
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[")
+            for row in rows:
+                f.write(",\n" if count else "\n")
+                f.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+                count += 1
+            f.write("\n]\n")
+    else:
+        raise ValueError(f"Unsupported file type for export: {path.suffix}, use one of {', '.join(FILE_TYPES)}")
+    return count
+
+# Yields the records of the file as dictionaries, the format is chosen by the file extension
+def read_records(path):
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        yield from read_csv(path)
+    elif suffix in (".jsonl", ".ndjson"):
+        yield from read_json_lines(path)
+    elif suffix == ".json":
+        yield from read_json_array(path)
+    else:
+        raise ValueError(f"Unsupported file type: {path.suffix}")
+
+# CSV rows one at a time
+def read_csv(path):
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        yield from csv.DictReader(f)
+
+# JSON lines, one object on each line
+def read_json_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# Objects of a JSON array one at a time, the file is read in blocks and decoded as it goes
+def read_json_array(path, block_size=65536):
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(block_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError("JSON file must contain an array of books")
+        buffer = buffer[1:]
+        done = False
+
+        while True:
+            # Skip the separators between the objects
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # Object continues in the next block
+                if done:
+                    raise
+                more = f.read(block_size)
+                if not more:
+                    done = True
+                buffer += more
+                continue
+            yield record
+            buffer = buffer[end:]
+
+# Turns a record into a Book, Goodreads exports are recognized by their column names
+def record_to_book(record):
+    if "Exclusive Shelf" in record or "Title" in record:
+        return goodreads_to_book(record)
+
+    owned = record.get("owned", True)
+    if isinstance(owned, str):
+        owned = owned.strip().lower() in ("1", "true", "yes")
+    return Book(title=record["title"],
+                author=record["author"],
+                pages=_to_int(record.get("pages")) or 0,
+                genre=record.get("genre") or "",
+                status=record.get("status") or "UNREAD",
+                current_page=_to_int(record.get("current_page")) or 0,
+                date_added=record.get("date_added") or None,
+                date_finished=record.get("date_finished") or None,
+                owned=bool(owned),
+                rating=_to_int(record.get("rating")))
+
+# Goodreads CSV row to a Book
+def goodreads_to_book(record):
+    pages = _to_int(record.get("Number of Pages")) or 0
+    status = GOODREADS_SHELVES.get(record.get("Exclusive Shelf", ""), "UNREAD")
+
+    # Goodreads rates from 1 to 5 and 0 means not rated, the books here are rated from 1 to 10
+    stars = _to_int(record.get("My Rating"))
+    rating = stars * 2 if stars else None
+
+    # First custom shelf works as the genre
+    shelves = [shelf.strip() for shelf in (record.get("Bookshelves") or "").split(",") if shelf.strip()]
+    genre = next((shelf for shelf in shelves if shelf not in GOODREADS_SHELVES), "")
+
+    return Book(title=record["Title"],
+                author=record.get("Author", ""),
+                pages=pages,
+                genre=genre,
+                status=status,
+                current_page=pages if status == "READ" else 0,
+                date_added=_goodreads_date(record.get("Date Added")),
+                date_finished=_goodreads_date(record.get("Date Read")) if status == "READ" else None,
+                owned=(_to_int(record.get("Owned Copies")) or 0) > 0,
+                rating=rating)
+
+# Goodreads writes dates as YYYY/MM/DD, the database uses YYYY-MM-DD
+def _goodreads_date(value):
+    if not value:
+        return None
+    return value.strip().replace("/", "-")
+
+# Integer from a text field, None when it is empty
+def _to_int(value):
+    if value is None or value == "":
+        return None
+    return int(float(value))
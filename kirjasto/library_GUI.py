@@ -1,12 +1,258 @@
-from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QListWidget, QLineEdit, QFormLayout, QCheckBox, QInputDialog
-from repo import BookRepository
+from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QListView, QLineEdit, QFormLayout, QCheckBox, QInputDialog, QDialog, QPlainTextEdit
+from PySide6.QtGui import QFontDatabase
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from array import array
+from collections import OrderedDict
+from datetime import date
+from book_service import BookService
 from book import Book
 
+# List model that reads the books from the repository a page at a time
+# The view asks for more rows with canFetchMore/fetchMore only when it is scrolled near the end,
+# and the text of a row is made in data only when the view shows that row.
+# The pages are searched on the database thread of the service and added when they come back.
+# Only the ids of the fetched rows are kept for the whole list, the Book objects are kept for the
+# CACHE_SIZE most recently shown rows and the rest are loaded again by id when they are scrolled back to.
+# The rows of the books are looked up from the ids only when a change event comes for them, see rows_of
+class BookListModel(QAbstractListModel):
+    PAGE_SIZE = 200   # Books fetched at a time
+    CACHE_SIZE = 2000 # Book objects kept in memory
+
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+        self.filters = {"title": "", "author": "", "genre": ""}
+        self.ids = array("q")      # Ids of the books fetched so far in the order of the list, 8 bytes a row
+        self.books = OrderedDict() # Book id -> Book of the recently shown rows, least recently shown first
+        self.loading = set()       # First rows of the blocks that are being loaded again
+        self.extra_ids = set()     # Books added to the list out of order, skipped when a later page has them
+        self.after = None          # Cursor where the next page goes on from
+        self.has_more = True       # False when the last page has come
+        self.fetching = False      # True while a page is on its way
+        self.generation = 0        # Raised when the list starts over, results asked for an older list are dropped
+
+    # Start over with new search filters, the view fetches the first page by itself
+    def set_filters(self, title="", author="", genre=""):
+        self.beginResetModel()
+        self.filters = {"title": title, "author": author, "genre": genre}
+        self.ids = array("q")
+        self.books.clear()
+        self.loading.clear()
+        self.extra_ids.clear()
+        self.after = None
+        self.has_more = True
+        self.fetching = False
+        self.generation += 1 # Pages and blocks of the old search that are still on their way are dropped
+        self.endResetModel()
+
+    # Fetch the same rows again after the books have changed
+    def reload(self):
+        self.set_filters(**self.filters)
+
+    # Number of rows fetched so far
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.ids)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more and not self.fetching
+
+    # Ask for the next page of books, the search runs in the background and goes on from the last page
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.fetching:
+            return
+        self.fetching = True
+        self.service.call("search_page", **self.filters, limit=self.PAGE_SIZE, after=self.after,
+                          key="search", callback=self.for_this_list(self.page_loaded),
+                          error=self.for_this_list(self.page_failed))
+
+    # Wraps the callback so that it is skipped when the list has started over since the call was made
+    def for_this_list(self, callback):
+        generation = self.generation
+        def call(result):
+            if generation == self.generation:
+                callback(result)
+        return call
+
+    # The page did not come, the view can ask for it again
+    def page_failed(self, message):
+        self.fetching = False
+
+    # Add the page that came back to the end of the list
+    def page_loaded(self, result):
+        page, self.after = result
+        self.fetching = False
+        self.has_more = self.after is not None
+        self.append_books([book for book in page if book.id not in self.extra_ids])
+        if not self.has_more:
+            self.extra_ids.clear()
+
+    # Adds the books to the end of the list
+    def append_books(self, books):
+        if not books:
+            return
+        first = len(self.ids)
+        self.beginInsertRows(QModelIndex(), first, first + len(books) - 1)
+        self.ids.extend(book.id for book in books)
+        self.keep_books(books)
+        self.endInsertRows()
+
+    # Adds books that a change brought to the end of the list, books already in the list are skipped
+    # While pages are still coming the same books may come again with them, so they are remembered
+    def add_books(self, books):
+        rows = self.rows_of(book.id for book in books)
+        books = [book for book in books if book.id not in rows]
+        if self.has_more:
+            self.extra_ids.update(book.id for book in books)
+        self.append_books(books)
+
+    # Puts the books to the cache as the most recently shown ones, the least recently shown go over the limit
+    def keep_books(self, books):
+        for book in books:
+            self.books[book.id] = book
+            self.books.move_to_end(book.id)
+        while len(self.books) > self.CACHE_SIZE:
+            self.books.popitem(last=False)
+
+    # Rows of the books that are in the list, book id -> row
+    # All the books of a change are found with one pass over the ids instead of keeping an id -> row
+    # map: the map would cost about 100 bytes a row next to the 8 of the array, and every removed row
+    # would have to shift the rows after it. At 100k rows the pass takes about 3 ms for any number
+    # of changed books, and change events come only from saved writes
+    def rows_of(self, book_ids):
+        book_ids = set(book_ids)
+        if not book_ids:
+            return {}
+        return {book_id: row for row, book_id in enumerate(self.ids) if book_id in book_ids}
+
+    # Removes the rows of the books, the rows after them move up
+    # The last row goes first so the rows still to be removed stay where they were found
+    def remove_books(self, book_ids):
+        for book_id, row in sorted(self.rows_of(book_ids).items(), key=lambda item: -item[1]):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.ids[row]
+            self.books.pop(book_id, None)
+            self.endRemoveRows()
+
+    # Replaces the shown copies of the updated books with the new ones from the worker
+    def refresh_books(self, books):
+        for book in books:
+            if book.id in self.books:
+                self.books[book.id] = book
+
+    # Loads the books of the block of PAGE_SIZE rows around the row again by their ids
+    def load_block(self, row):
+        first = row - row % self.PAGE_SIZE
+        if first in self.loading:
+            return
+        self.loading.add(first)
+        ids = self.ids[first:first + self.PAGE_SIZE].tolist()
+        self.service.call("search", ids=ids,
+                          callback=self.for_this_list(lambda books: self.block_loaded(first, ids, books)),
+                          error=self.for_this_list(lambda message: self.loading.discard(first)))
+
+    # Repaints the rows of the loaded block, or every row if the list has changed since
+    def block_loaded(self, first, ids, books):
+        self.loading.discard(first)
+        self.keep_books(books)
+        if not self.ids:
+            return
+        if self.ids[first:first + len(ids)].tolist() == ids:
+            self.dataChanged.emit(self.index(first), self.index(first + len(ids) - 1))
+        else:
+            self.dataChanged.emit(self.index(0), self.index(len(self.ids) - 1))
+
+    # Patches the rows that a saved write changed instead of searching everything again
+    # The change comes with copies of the updated books, they replace the ones shown in the rows
+    def apply_changes(self, changes):
+        if changes["reset"]:
+            self.set_filters(**self.filters)
+            return
+        self.refresh_books(changes["books"])
+
+        self.remove_books(changes["deleted"])
+
+        # With a search the changed books are checked against it: updated books that no longer match
+        # leave the list and the new matches are added. A ranked match can belong to a page that is
+        # loaded already, so they are checked even when more pages are coming
+        updated = changes["updated"]
+        added = changes["added"]
+        if any(self.filters.values()):
+            if updated:
+                self.service.call("search", **self.filters, ids=updated,
+                                  callback=self.for_this_list(lambda books: self.filter_updated(updated, books)))
+            if added:
+                self.service.call("search", **self.filters, ids=added, callback=self.for_this_list(self.add_books))
+            return
+
+        # Without a search every book belongs to the list. New books have the biggest ids, so they come
+        # with the next page if the list is not fully loaded yet
+        self.repaint_books(updated)
+        if added and not self.has_more:
+            self.service.call("search", ids=added, callback=self.for_this_list(self.add_books))
+
+    # Removes the updated books that the search did not find and adds the ones it found
+    def filter_updated(self, updated, matches):
+        matching = {book.id for book in matches}
+        self.repaint_books(book_id for book_id in updated if book_id in matching)
+        self.remove_books(book_id for book_id in updated if book_id not in matching)
+        self.add_books(matches)
+
+    # Repaints the rows of the books that are in the list
+    def repaint_books(self, book_ids):
+        for row in self.rows_of(book_ids).values():
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+    # Text of a visible row, a row whose book has left the cache is loaded again
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        book = self.book_at(index.row())
+        if book is None:
+            self.load_block(index.row())
+            return "Loading..."
+        self.books.move_to_end(book.id)
+        return str(book)
+
+    # Book object of a row, None while it is being loaded again
+    def book_at(self, row):
+        return self.books.get(self.ids[row])
+
+# Debug window that shows the query timing report of the repository
+# Refresh asks for a new report, the report comes from the database thread like the other results
+class QueryStatsPanel(QDialog):
+    def __init__(self, service, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.setWindowTitle("Query Stats")
+        self.resize(900, 600)
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        # Report text with a fixed width font so that the plans line up
+        self.report_text = QPlainTextEdit()
+        self.report_text.setReadOnly(True)
+        self.report_text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout.addWidget(self.report_text)
+
+        self.refresh_button = QPushButton("Refresh")
+        self.refresh_button.clicked.connect(self.refresh)
+        layout.addWidget(self.refresh_button)
+
+    def refresh(self):
+        self.service.call("query_report", key="query_report", callback=self.show_report)
+
+    def show_report(self, report):
+        self.report_text.setPlainText(report or "Query timing is off, start with --debug-queries")
+
 class BookshelfGUI(QWidget):
-    def __init__(self, repo: BookRepository):
+    def __init__(self, service: BookService):
         # Get access to sibling class methods
         super().__init__()
-        self.repo = repo # define repository for the class as global variable
+        self.service = service # Runs the repository calls on the database thread, results come back to the callbacks
 
         # Set title for the GUI and the geometry
         self.setWindowTitle("Bookshelf")
@@ -17,9 +263,17 @@ class BookshelfGUI(QWidget):
         self.setLayout(self.layout)
 
         # Creates a scrollable list of books as a blank screen on the GUI
-        self.book_list = QListWidget()
+        # The list shows the rows of the model, which fetches them from the repository when needed
+        self.book_model = BookListModel(service)
+        self.book_list = QListView()
+        self.book_list.setModel(self.book_model)
+        self.book_list.setUniformItemSizes(True) # Same height rows, the view does not have to measure each one
         self.layout.addWidget(self.book_list)
 
+        # Saved writes patch the changed rows and refresh the stats
+        self.service.books_changed.connect(self.book_model.apply_changes)
+        self.service.books_changed.connect(lambda changes: self.update_stats())
+
         # Create layout for the book items and asks for input for book attributes
         self.form_layout = QFormLayout()
         self.title_input = QLineEdit()  # Asks for title in the main screen
@@ -77,10 +331,14 @@ class BookshelfGUI(QWidget):
         self.search_genre = QLineEdit()
         self.search_genre.setPlaceholderText("Search by genre")
 
-        # Reaload the list whenever user types
-        self.search_title.textChanged.connect(self.load_books)
-        self.search_author.textChanged.connect(self.load_books)
-        self.search_genre.textChanged.connect(self.load_books)
+        # Reaload the list when the user stops typing for a moment, not on every key press
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.load_books)
+        self.search_title.textChanged.connect(self.search_timer.start)
+        self.search_author.textChanged.connect(self.search_timer.start)
+        self.search_genre.textChanged.connect(self.search_timer.start)
 
         # Search layout
         self.search_layout = QFormLayout()
@@ -94,35 +352,48 @@ class BookshelfGUI(QWidget):
         self.stats_label = QLabel()
         self.layout.addWidget(self.stats_label)
 
+        # Yearly reading stats of the last ten years under the total stats
+        self.yearly_label = QLabel()
+        self.layout.addWidget(self.yearly_label)
+
+        # Message of the latest failed database call, hidden until a call fails
+        self.error_label = QLabel()
+        self.error_label.setStyleSheet("color: red")
+        self.error_label.hide()
+        self.layout.addWidget(self.error_label)
+        self.service.database_error.connect(self.show_error)
+
+        # Button for the query timing window, only when the repository times its queries
+        self.query_stats_panel = None
+        if service.instrument:
+            self.query_stats_button = QPushButton("Query Stats")
+            self.query_stats_button.clicked.connect(self.show_query_stats)
+            self.layout.addWidget(self.query_stats_button)
+
     # Fetch all books from the repository and create a list for them als oupadting the stats label
     def load_books(self):
-        
-        # Start with a clear screen
-        self.book_list.clear()
 
-        # Fetch books from repository
-        books = self.repo.get_all_books()
-        
-        # Case insesitive search filters
-        title_filter = self.search_title.text().lower()
-        author_filter = self.search_author.text().lower()
-        genre_filter = self.search_genre.text().lower()
-
-        # Filter books to a global list for searching
-        self.filtered_books = [
-            b for b in books
-            if title_filter in b.title.lower() and
-                author_filter in b.author.lower() and
-                genre_filter in b.genre.lower()
-        ]
-
-        # Adds filtered books to the book list space
-        for book in self.filtered_books:
-            self.book_list.addItem(str(book))
+        # Search the books through the full text index of the repository, every word in the
+        # search boxes has to match the start of a word in its own column. The model fetches the
+        # matching books a page at a time as the list is scrolled
+        self.book_model.set_filters(
+            title=self.search_title.text(),
+            author=self.search_author.text(),
+            genre=self.search_genre.text())
 
         # Updates stats after every loading
         self.update_stats()
 
+        # The list is loaded again, so an earlier error is no longer shown
+        self.error_label.hide()
+
+    # Returns the selected book in the list or None if nothing is selected
+    def selected_book(self):
+        selected = self.book_list.selectionModel().selectedIndexes()
+        if not selected:
+            return None
+        return self.book_model.book_at(selected[0].row())
+
     # Adds a new book object to the repo and reloads the GUI and stats
     def add_book(self):
         
@@ -138,22 +409,16 @@ class BookshelfGUI(QWidget):
         # Create a new book object according to the user inputs
         new_book = Book(title=title, author=author, pages=pages, genre=genre, owned=owned)
 
-        # Add new book to the repostiory and update the book list
-        self.repo.add_book(new_book)
-        self.load_books()
-        self.update_stats()
+        # Add new book to the repostiory, the list gets it from the change event when it is saved
+        self.service.call("add_book", new_book)
 
     # Updates reading progress
     def update_progress(self):
 
         # If no book in the book list return
-        selected = self.book_list.selectedItems()
-        if not selected:
+        book = self.selected_book()
+        if book is None:
             return
-        
-        # Select book by index
-        index = self.book_list.row(selected[0])
-        book = self.repo.get_all_books()[index]
 
         # Fetch selected books page values
         page, ok = QInputDialog.getInt(
@@ -161,64 +426,58 @@ class BookshelfGUI(QWidget):
         )
 
         # Updates the current page as the page and set min and max
+        # The change is made to a copy, the book in the list gets it from the database thread when it is saved
         if ok:
-            book.current_page = page
+            edited = book.copy()
+            edited.current_page = page
 
             # Changes status to reading if the book is unread and is updated
-            if page > 0 and book.status == "UNREAD":
-                book.status = "READING"
+            if page > 0 and edited.status == "UNREAD":
+                edited.status = "READING"
         
-        # Update repository and load the books list
-        self.repo.update(book)
-        self.load_books()
+            # Update repository, the row is repainted when the change is saved
+            self.service.call("update", edited)
 
     # Gets the selceted item from repo by index and marks it as read
     def mark_selected_read(self):
-        selected = self.book_list.selectedItems()
-        
-        # If book list is empty return
-        if not selected:
+        # If book list is empty return, same logic as with updating progress
+        book = self.selected_book()
+        if book is None:
             return
 
-        # Same logic as with updating progress
-        index = self.book_list.row(selected[0])
-        book = self.repo.get_all_books()[index]
-
         # Set set rating and set min and max values
         rating, ok = QInputDialog.getInt(
             self, "Rating", "Rating (1-10):",10, 1, 10
         )
 
-        # Gives read book a rating
+        # Gives read book a rating, to a copy like in update_progress
         if ok:
-            book.mark_read(rating=rating)
+            edited = book.copy()
+            edited.mark_read(rating=rating)
 
-            # Updates selected book and load the list again for selected book
-            self.repo.update(book)
-            self.load_books()
+            # Updates selected book, the row is repainted when the change is saved
+            self.service.call("update", edited)
 
     # Gets selected item from repo by index and deletes it from the database
     def delete_selected_book(self):
-        selected = self.book_list.selectedItems()
-        if not selected:
+        book = self.selected_book()
+        if book is None:
             return
 
-        index = self.book_list.row(selected[0])
-        book = self.repo.get_all_books()[index]
-
-        # Delete selected book from the the repo and updates the book list
-        self.repo.delete_book(book.id)
-        self.load_books()
+        # Delete selected book from the the repo, the row is removed when the change is saved
+        self.service.call("delete_book", book.id)
 
-    # Fetches stats from the repository and converts tem to string
-    def update_stats(self, books=None):
+    # Fetches stats from the repository in the background, show_stats and show_yearly_stats get the results
+    def update_stats(self):
+        self.service.call("get_stats", key="stats", callback=self.show_stats)
 
-        # If no books in book list leaves the stats space empty
-        if books is None:
-            books = self.filtered_books if hasattr(self, "filtered_books") else []
+        # Update the yearly stats at the same time, one query for the last ten years
+        this_year = date.today().year
+        self.service.call("summary_by_year", range(this_year - 9, this_year + 1),
+                          key="yearly", callback=self.show_yearly_stats)
 
-        # Fetch stats from repo
-        stats = self.repo.get_stats()
+    # Converts the stats to string
+    def show_stats(self, stats):
 
         # Format the average rating
         avg = stats["average_rating"]
@@ -232,11 +491,40 @@ class BookshelfGUI(QWidget):
             f"Avg Rating: {avg_text}"
         )
 
-
+    # Shows a line for each of the last ten years
+    def show_yearly_stats(self, summaries):
+        lines = ["Yearly stats:"]
+        for summary in reversed(summaries): # Newest year first
+            avg = summary["average_rating"]
+            avg_text = f"{avg:.2f}" if avg else "N/A"
+            ownership = summary["ownership"]
+            lines.append(
+                f"{summary['year']}: Read: {summary['books_finished']} | "
+                f"Pages: {summary['pages_read']} | "
+                f"Owned/Not Owned: {ownership['owned']}/{ownership['not_owned']} | "
+                f"Avg Rating: {avg_text}"
+            )
+        self.yearly_label.setText("\n".join(lines))
+
+    # Shows the message of a failed database call, scrolling or Refresh List tries the failed page again
+    def show_error(self, message):
+        self.error_label.setText(f"Database error: {message}")
+        self.error_label.show()
+
+    # Opens the query timing window, made on the first time
+    def show_query_stats(self):
+        if self.query_stats_panel is None:
+            self.query_stats_panel = QueryStatsPanel(self.service, self)
+        self.query_stats_panel.show()
+        self.query_stats_panel.refresh()
 
 # Displays the main window and starts the event loop 
-def run_gui(repo):
+# The window uses the database of the repository through its own connection on the database thread
+# debug_queries times the queries of the window and adds the Query Stats button
+def run_gui(repo, debug_queries=False):
     app = QApplication([])
-    window = BookshelfGUI(repo)
+    service = BookService(repo.db_path, instrument=debug_queries)
+    window = BookshelfGUI(service)
     window.show()
-    app.exec()
\ No newline at end of file
+    app.exec()
+    service.close()
\ No newline at end of file
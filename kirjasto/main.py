@@ -1,45 +1,145 @@
+# Runs the bookshelf, without a command the GUI opens. The other commands work from the command line:
+#   python main.py add "Dune" "Frank Herbert" 412 --genre Scifi
+#   python main.py search --author herbert
+#   python main.py stats
+#   python main.py yearly 2024 2025
+#   python main.py import goodreads_library_export.csv
+#   python main.py export books.jsonl
+# PySide6 is imported only for the GUI, so the commands start quickly from scripts and cron jobs
+
+# Imports
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
 from book import Book
 from repo import BookRepository
-from library_GUI import run_gui
 
-def main():
+# Command line arguments, every command is a sub command
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bookshelf for tracking owned and read books")
+    parser.add_argument("--db", default="library.db", help="database file")
+    parser.add_argument("--debug-queries", action="store_true",
+                        help="time the queries and print the report at the end (Query Stats window in the GUI)")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("gui", help="open the window (default)")
+
+    add = commands.add_parser("add", help="add a book")
+    add.add_argument("title")
+    add.add_argument("author")
+    add.add_argument("pages", type=int)
+    add.add_argument("--genre", default="")
+    add.add_argument("--not-owned", action="store_true", help="the book is not owned")
+
+    search = commands.add_parser("search", help="search books, every word matches the start of a word")
+    search.add_argument("query", nargs="*", help="words searched from title, author and genre")
+    search.add_argument("--title", default="")
+    search.add_argument("--author", default="")
+    search.add_argument("--genre", default="")
+    search.add_argument("--limit", type=int)
+
+    commands.add_parser("stats", help="print the stats of the whole library")
+
+    yearly = commands.add_parser("yearly", help="print the reading stats of years")
+    yearly.add_argument("years", nargs="*", type=int, help="years to print, this year by default")
+
+    import_file = commands.add_parser("import", help="import books from a CSV or JSON file")
+    import_file.add_argument("path", type=book_file)
+
+    export = commands.add_parser("export", help="export all books to a CSV, JSON or JSON lines file")
+    export.add_argument("path", type=book_file)
+    return parser.parse_args(argv)
+
+# Path argument of the import and export commands, other file types are rejected before the database is opened
+def book_file(path):
+    from importer import FILE_TYPES
+    if Path(path).suffix.lower() not in FILE_TYPES:
+        raise argparse.ArgumentTypeError(f"unsupported file type, use one of {', '.join(FILE_TYPES)}")
+    return path
+
+# Prints the key: value lines of a stats dictionary
+def print_stats(stats):
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+
+def main(argv=None):
+    args = parse_args(argv)
 
     # Define the repository
-    repo = BookRepository()
+    repo = BookRepository(args.db, instrument=args.debug_queries)
     
-    # Run the program for defined repository
-    run_gui(repo)
+    # The repository is closed also when a command fails
+    try:
+        # Run the program for defined repository
+        if args.command in (None, "gui"):
+            from library_GUI import run_gui # Qt is loaded only here
+            run_gui(repo, debug_queries=args.debug_queries)
+
+        elif args.command == "add":
+            book = Book(args.title, args.author, args.pages, args.genre, owned=not args.not_owned)
+            repo.add_book(book)
+            print(f"Added {book.id}: {book}")
+
+        elif args.command == "search":
+            for book in repo.search(" ".join(args.query), args.title, args.author, args.genre, limit=args.limit):
+                print(f"{book.id}: {book}")
+
+        elif args.command == "stats":
+            print_stats(repo.get_stats())
+
+        elif args.command == "yearly":
+            # One query for the range of the years, only the asked years are printed
+            years = args.years or [date.today().year]
+            for summary in repo.summary_by_year(range(min(years), max(years) + 1)):
+                if summary["year"] not in years:
+                    continue
+                print(f"--- {summary['year']} ---")
+                print_stats(summary)
+
+        elif args.command == "import":
+            from importer import import_books
+            print(f"Imported {import_books(repo, args.path)} books")
+
+        elif args.command == "export":
+            from importer import export_books
+            print(f"Exported {export_books(repo, args.path)} books")
+
+        # Test code to see if the repo works as intended
+        #book1 = Book("bookname1", "auhtor1", 608, "Comedy", owned=True)
+        #book2 = Book("bookname2", "author2", 701, "Tragedy", owned=False)
 
-    # Test code to see if the repo works as intended
-    #book1 = Book("bookname1", "auhtor1", 608, "Comedy", owned=True)
-    #book2 = Book("bookname2", "author2", 701, "Tragedy", owned=False)
+        #repo.add_book(book1)
+        #repo.add_book(book2)
 
-    #repo.add_book(book1)
-    #repo.add_book(book2)
+        #book1.mark_read(rating=8)
+        #repo.update(book1)
 
-    #book1.mark_read(rating=8)
-    #repo.update(book1)
+        #book2.update_prog(241)
+        #repo.update(book2)
 
-    #book2.update_prog(241)
-    #repo.update(book2)
+        #print("\n--- All Books ---")
+        #for book in repo.get_all_books():
+        #      print(book)
 
-    #print("\n--- All Books ---")
-    #for book in repo.get_all_books():
-    #      print(book)
+        #print("\n--- Stats ---")
+        #stats = repo.get_stats()
+        #for key, value in stats.items():
+        #      print(f"{key}: {value}")
 
-    #print("\n--- Stats ---")
-    #stats = repo.get_stats()
-    #for key, value in stats.items():
-    #      print(f"{key}: {value}")
+        #print("\n--- Yearly Stats ---")
+        #year  = 2026
+        #summary = repo.yearly_summary(year)
+        #for key, value in summary.items():
+        #     print(f"{key}: {value}")
 
-    #print("\n--- Yearly Stats ---")
-    #year  = 2026
-    #summary = repo.yearly_summary(year)
-    #for key, value in summary.items():
-    #     print(f"{key}: {value}")
+        # Query timing report of the command to the error output so that it does not mix with the results
+        if args.debug_queries and args.command not in (None, "gui"):
+            print(repo.query_report(), file=sys.stderr)
 
     # Close repository
-    repo.close()
+    finally:
+        repo.close()
 
 
 if __name__ == "__main__":
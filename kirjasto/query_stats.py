@@ -0,0 +1,228 @@
+# Imports
+import re
+import time
+from collections import deque
+
+# Repository methods that are timed when the instrumentation is on
+INSTRUMENTED_METHODS = ("search", "search_page", "get_stats", "yearly_summary", "summary_by_year", "get_all_books",
+                        "add_book", "add_books", "update", "update_many", "delete_book", "delete_many",
+                        "clear_books")
+
+# Upper limits of the latency histogram buckets in milliseconds, the last bucket has everything slower
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+# ORDER BY the rowid followed by a LIMIT, a scan in rowid order stops after the limit
+ROWID_LIMIT = re.compile(r"ORDER BY (?:\w+\.)?(?:id|rowid)(?: ASC| DESC)? LIMIT ", re.IGNORECASE)
+
+# Timing of the repository methods and the SQL they run
+# Each method gets a call count and a latency histogram. Every statement is timed by the cursor, from
+# the execute to the last fetch, and a statement slower than slow_ms goes to the slow query log with
+# its bound parameters, query plan and the method that ran it. Every different statement is explained
+# once, the ones that scan the whole books table are listed in the full scan report.
+# The explaining is done after the timing of the call, so it never makes a call look slower
+class QueryStats:
+    def __init__(self, connection, slow_ms=50, slow_log_size=100):
+        self.connection = connection
+        self.slow_ms = slow_ms
+        self.methods = {} # name -> {"calls", "total_ms", "max_ms", "histogram"}
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.plans = {}   # sql -> query plan lines
+        self.scans = {}   # sql -> number of times a statement with a full table scan was run
+        self.method = None    # Name of the timed method going on, None outside of them
+        self.unexplained = [] # (sql, params) of new statements run during the call
+        self.in_call = False
+
+    # Wraps a repository method so that its calls are timed
+    # A timed method called by another one is part of the time of the outer call and is not counted again
+    def wrap(self, name, method):
+        def timed(*args, **kwargs):
+            if self.in_call:
+                return method(*args, **kwargs)
+            self.in_call = True
+            self.method = name
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                self.in_call = False
+                self.method = None
+                self.add_call(name, elapsed)
+                self.explain_new()
+        return timed
+
+    # Adds a call to the stats of the method
+    def add_call(self, name, elapsed):
+        stats = self.methods.get(name)
+        if stats is None:
+            stats = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "histogram": [0] * (len(BUCKETS_MS) + 1)}
+            self.methods[name] = stats
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed
+        stats["max_ms"] = max(stats["max_ms"], elapsed)
+        bucket = 0
+        while bucket < len(BUCKETS_MS) and elapsed > BUCKETS_MS[bucket]:
+            bucket += 1
+        stats["histogram"][bucket] += 1
+
+    # Records a statement run by the cursor that took ms to execute, runs is the number of parameter
+    # sets of an executemany. Returns the record of the statement, the time of its fetches is added to it
+    # The plan is asked from SQLite the first time the statement is seen, during a timed call only after it
+    def add_statement(self, sql, params, ms, runs=1):
+        params = list(params)
+        statement = {"method": self.method, "sql": sql, "params": params, "runs": runs, "ms": ms}
+        if ms >= self.slow_ms:
+            self.slow_queries.append(statement)
+
+        if sql not in self.plans:
+            self.unexplained.append((sql, params))
+            if not self.in_call:
+                self.explain_new()
+        else:
+            self.count_scan(sql)
+        return statement
+
+    # Adds the time of a fetch to the statement, it goes to the slow query log when it gets over slow_ms
+    def add_time(self, statement, ms):
+        was_slow = statement["ms"] >= self.slow_ms
+        statement["ms"] += ms
+        if not was_slow and statement["ms"] >= self.slow_ms:
+            self.slow_queries.append(statement)
+
+    # Explains the new statements of the call
+    def explain_new(self):
+        unexplained = self.unexplained
+        self.unexplained = []
+        for sql, params in unexplained:
+            if sql not in self.plans:
+                self.plans[sql] = self.explain(sql, params)
+            self.count_scan(sql)
+
+    # Counts a run of the statement if its plan reads the whole table
+    def count_scan(self, sql):
+        plan = self.plans[sql]
+        if any(self.is_full_scan(line) for line in plan) and not self.is_bounded_scan(sql, plan):
+            self.scans[sql] = self.scans.get(sql, 0) + 1
+
+    # Statement that scans the table in rowid order and stops after its LIMIT, like the first page of
+    # search_page. A plan that sorts the rows in a temporary b-tree reads them all before the limit
+    @staticmethod
+    def is_bounded_scan(sql, plan):
+        return (ROWID_LIMIT.search(" ".join(sql.split())) is not None
+                and not any("TEMP B-TREE" in line for line in plan))
+
+    # Query plan of the statement as text lines, empty for statements that have no plan
+    def explain(self, sql, params):
+        if not sql.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")):
+            return []
+        try:
+            rows = self.connection.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        except Exception as error:
+            return [f"EXPLAIN failed: {error}"]
+        return [row[3] for row in rows]
+
+    # Plan line that reads every row of a real table, also when the rows are read through an index
+    # The full text index is searched through its own index, so virtual tables are not counted
+    @staticmethod
+    def is_full_scan(line):
+        return line.startswith("SCAN ") and "VIRTUAL TABLE" not in line and "CONSTANT ROW" not in line
+
+    # All stats as a dictionary
+    def report(self):
+        methods = {}
+        for name, stats in sorted(self.methods.items()):
+            histogram = {f"<={limit}ms": count for limit, count in zip(BUCKETS_MS, stats["histogram"])}
+            histogram[f">{BUCKETS_MS[-1]}ms"] = stats["histogram"][-1]
+            methods[name] = {"calls": stats["calls"],
+                             "average_ms": stats["total_ms"] / stats["calls"],
+                             "max_ms": stats["max_ms"],
+                             "histogram": histogram}
+        slow_queries = [dict(statement, sql=" ".join(statement["sql"].split()),
+                             plan=self.plans.get(statement["sql"], []))
+                        for statement in self.slow_queries]
+        full_scans = [{"sql": " ".join(sql.split()), "runs": runs, "plan": self.plans[sql]}
+                      for sql, runs in sorted(self.scans.items(), key=lambda item: -item[1])]
+        return {"methods": methods, "slow_queries": slow_queries, "full_scans": full_scans}
+
+    # The report as text for printing and the GUI
+    def format_report(self):
+        report = self.report()
+        lines = ["Methods:"]
+        for name, stats in report["methods"].items():
+            lines.append(f"  {name}: {stats['calls']} calls, avg {stats['average_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
+            lines.append("    " + " ".join(f"{limit}:{count}" for limit, count in stats["histogram"].items() if count))
+
+        lines.append(f"Slow queries (over {self.slow_ms} ms):")
+        for statement in report["slow_queries"]:
+            method = f"in {statement['method']}" if statement["method"] else "outside the timed methods"
+            runs = f", {statement['runs']} runs" if statement["runs"] > 1 else ""
+            lines.append(f"  {statement['ms']:.2f} ms {method}{runs}")
+            lines.append(f"    {statement['sql']}")
+            lines.append(f"      params: {statement['params']}")
+            for line in statement["plan"]:
+                lines.append(f"      plan: {line}")
+
+        lines.append("Full table scans:")
+        for entry in report["full_scans"]:
+            lines.append(f"  {entry['runs']}x {entry['sql']}")
+            for line in entry["plan"]:
+                lines.append(f"      plan: {line}")
+        return "\n".join(lines)
+
+    # Starts over, the plans are explained again in case the schema or the indexes have changed
+    def reset(self):
+        self.methods.clear()
+        self.slow_queries.clear()
+        self.plans.clear()
+        self.scans.clear()
+
+
+# Cursor that times every statement it runs and tells the stats about it, everything else goes to the real cursor
+# SQLite runs a query as its rows are fetched, so the fetches are added to the time of the last statement
+class InstrumentedCursor:
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+        self._statement = None # Record of the last statement, None before the first one
+
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        self._cursor.execute(sql, params)
+        self._statement = self._stats.add_statement(sql, params, (time.perf_counter() - start) * 1000)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        start = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_params)
+        elapsed = (time.perf_counter() - start) * 1000
+        self._statement = None
+        if seq_of_params:
+            self._statement = self._stats.add_statement(sql, seq_of_params[0], elapsed, len(seq_of_params))
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(start)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(self._cursor.arraysize if size is None else size)
+        self._fetched(start)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(start)
+        return rows
+
+    # Adds the time since start to the last statement
+    def _fetched(self, start):
+        if self._statement is not None:
+            self._stats.add_time(self._statement, (time.perf_counter() - start) * 1000)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
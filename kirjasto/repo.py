@@ -1,17 +1,45 @@
 # Imports
 import sqlite3
 import os
+import json
+import weakref
+from contextlib import contextmanager
 from book import Book
 from pathlib import Path
+from query_stats import QueryStats, InstrumentedCursor, INSTRUMENTED_METHODS
 
 BASE_DIR = Path(__file__).resolve().parent
 SCHEMA_PATH = BASE_DIR / "schema.sql"
 
+# Version of schema.sql, stored in the database as PRAGMA user_version. Raise it when the schema changes
+# so that the existing databases run the schema again on the next start
+SCHEMA_VERSION = 1
+
+# Changed ids kept for the change event of one write, a bigger write like an import is sent as a reset
+MAX_CHANGED_IDS = 10000
+
+# Update statement shared by update and update_many, the id comes last
+UPDATE_SQL = """
+            UPDATE books
+            SET
+                title = ?,
+                author = ?,
+                pages = ?,
+                current_page = ?,
+                status = ?,
+                genre = ?,
+                owned = ?,
+                date_added = ?,
+                date_finished = ?,
+                rating = ?
+            WHERE id = ?"""
+
 # Repository object that connects the sql schemas database with the python script
 class BookRepository:
 
     # Initialize the database using sqlite3
-    def __init__(self, db_path='library.db'):
+    # instrument=True times the methods and their SQL, statements slower than slow_ms go to the slow query log
+    def __init__(self, db_path='library.db', instrument=False, slow_ms=50):
         self.db_path = Path(db_path).resolve()
 
         # For debugging only, comment out for actual usage !!!
@@ -21,8 +49,51 @@ class BookRepository:
         self.connect = sqlite3.connect(db_path) # Connect to the on-disk database or create one if doesnt exist
         self.connect.row_factory = sqlite3.Row
         self.cursor = self.connect.cursor()
+
+        # Write ahead log lets the reading connections and the writing connection work at the same time,
+        # the GUI reads on one thread while an import writes on another
+        self.cursor.execute("PRAGMA journal_mode = WAL")
+        self.cursor.execute("PRAGMA synchronous = NORMAL") # Safe with WAL, commits do not wait for the disk
+
+        # How many transaction blocks are open, the writes commit by themselves only outside of them
+        self._transaction_depth = 0
+
+        # Stats computed by get_stats and summary_by_year, cleared by every write made through the repository
+        self._cache = {}
+
+        # Identity map: id -> the Book object loaded for that row, so every query returns the same object
+        # for the same book. Weak references let the books that nothing uses anymore go away
+        self._books = weakref.WeakValueDictionary()
+
+        # Functions called with the changes after every saved write, and the changes of the open transaction
+        self._listeners = []
+        self._pending_changes = self._no_changes()
+
+        # Updated books whose values go to the identity map when the write is saved, so the loaded
+        # objects never get values that are rolled back
+        self._pending_books = []
         self._initialize_database()
 
+        # Query timing, None when it is off so the methods run without any extra work
+        self.query_stats = None
+        if instrument:
+            self.enable_instrumentation(slow_ms)
+
+    # Starts timing the methods and the SQL they run, the results are in self.query_stats
+    def enable_instrumentation(self, slow_ms=50):
+        if self.query_stats is not None:
+            return
+        self.query_stats = QueryStats(self.connect, slow_ms)
+        self.cursor = InstrumentedCursor(self.cursor, self.query_stats)
+        for name in INSTRUMENTED_METHODS:
+            setattr(self, name, self.query_stats.wrap(name, getattr(self, name)))
+
+    # Report of the query timing as text, None when the instrumentation is off
+    def query_report(self):
+        if self.query_stats is None:
+            return None
+        return self.query_stats.format_report()
+
     # debugging method to run test databases and reset it after each run
     def _reset_database(self):
         if self.db_path.exists():
@@ -30,14 +101,132 @@ class BookRepository:
             print(f"Deleted old database: {self.db_path}")
 
     # Opens the sql schema file 
-    def _initialize_database(self):
+    # The schema is run only when the database is older than SCHEMA_VERSION, so a normal start is just one PRAGMA query
+    def _initialize_database(self, force=False):
+        self.cursor.execute("PRAGMA user_version")
+        if not force and self.cursor.fetchone()[0] == SCHEMA_VERSION:
+            return
+
+        # Check if the search index exists already before the schema creates it
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'books_fts'")
+        had_index = self.cursor.fetchone() is not None
+
         with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
             self.cursor.executescript(f.read())
+
+        # Databases made before the search index get it filled from the existing books
+        if not had_index:
+            self.cursor.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+        self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         self.connect.commit()
     
+    # Groups the writes inside the with block into one transaction, so they are saved with one commit
+    # Rolls everything back if the block raises an error, blocks inside blocks join the outer one
+    @contextmanager
+    def transaction(self):
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            self._cache.clear()
+            if self._transaction_depth == 0:
+                self.connect.rollback()
+                self._books.clear() # Loaded books may hold values that were rolled back
+                self._pending_changes = self._no_changes()
+                self._pending_books = []
+            raise
+        self._transaction_depth -= 1
+        self._cache.clear()
+        if self._transaction_depth == 0:
+            self.connect.commit()
+            self._remember_written()
+            self._notify()
+
+    # Commit the write unless it is part of a bigger transaction, every write clears the cached stats
+    def _commit(self):
+        self._cache.clear()
+        if self._transaction_depth == 0:
+            self.connect.commit()
+            self._remember_written()
+            self._notify()
+
+    # Drops the cached stats, for timing the stat queries or after another program has written to the database
+    def clear_cache(self):
+        self._cache.clear()
+
+    # Registers a function that is called with a dictionary of the changed ids after every saved write:
+    # {"added": [...], "updated": [...], "deleted": [...], "reset": bool}. reset means that every book changed
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    @staticmethod
+    def _no_changes():
+        return {"added": [], "updated": [], "deleted": [], "reset": False}
+
+    # Records changed ids, they are sent to the listeners when the write is committed
+    # Past MAX_CHANGED_IDS the write is sent as a reset, so a big import does not keep every id in memory
+    def _changed(self, kind, book_ids):
+        changes = self._pending_changes
+        if changes["reset"]:
+            return
+        changes[kind].extend(book_ids)
+        if len(changes["added"]) + len(changes["updated"]) + len(changes["deleted"]) > MAX_CHANGED_IDS:
+            self._pending_changes = self._no_changes()
+            self._pending_changes["reset"] = True
+
+    # Sends the changes of the committed write to the listeners
+    def _notify(self):
+        changes = self._pending_changes
+        self._pending_changes = self._no_changes()
+        if not (changes["added"] or changes["updated"] or changes["deleted"] or changes["reset"]):
+            return
+        for listener in list(self._listeners):
+            listener(changes)
+
+    # Puts the book to the identity map, a different object already loaded for the same id gets the values
+    # Returns the object kept in the map
+    def _remember(self, book):
+        known = self._books.get(book.id)
+        if known is None:
+            self._books[book.id] = book
+            return book
+        if known is not book:
+            known.copy_from(book)
+        return known
+
+    # Loaded objects of the books, ids that have no loaded object are skipped
+    # The written books of a saved write are loaded while the listeners are called
+    def loaded_books(self, book_ids):
+        return [book for book in map(self._books.get, book_ids) if book is not None]
+
+    # Puts the books of the saved write to the identity map, before the listeners hear about the write
+    def _remember_written(self):
+        books = self._pending_books
+        self._pending_books = []
+        for book in books:
+            self._remember(book)
+
+    # Values of a book in the column order of the INSERT and UPDATE statements
+    def _book_values(self, book):
+        return (book.title,
+                book.author,
+                book.pages,
+                book.current_page,
+                book.status,
+                book.genre,
+                1 if book.owned else 0,
+                book.date_added,
+                book.date_finished,
+                book.rating)
+
     # Convert rows from the schema to Book objects
+    # A book that is loaded already is the same object, its values are refreshed from the row
     def _row_to_book(self, row):
-        return Book(
+        book = Book(
             id = row["id"],
             title = row["title"],
             author = row["author"],
@@ -49,105 +238,220 @@ class BookRepository:
             date_finished = row["date_finished"],
             owned = bool(row["owned"]),
             rating = row["rating"])
+        return self._remember(book)
     
     # Add a book to the database
     def add_book(self, book):
-        owned = 1 if book.owned else 0
         # Insert in to database a book with the given attribute inputs
         self.cursor.execute("""
                             INSERT INTO books (
                             title, author, pages, current_page, status,
                             genre, owned, date_added, date_finished, rating)
                             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                            (
-                                  book.title,
-                                  book.author,
-                                  book.pages,
-                                  book.current_page,
-                                  book.status,
-                                  book.genre,
-                                  owned,
-                                  book.date_added,
-                                  book.date_finished,
-                                  book.rating
-                            ))
-        self.connect.commit()
+                            self._book_values(book))
         book.id =self.cursor.lastrowid
+        self._remember(book) # A new id has no loaded object, a rollback clears the map anyway
+        self._changed("added", [book.id])
+        self._commit()
+
+    # Add many books with one statement and one commit, also sets the id of each book
+    # The books are read one at a time, so a generator of books is never in memory all at once
+    def add_books(self, books):
+        # Each row is inserted on its own so that its id can be read from lastrowid,
+        # the single commit at the end is what makes the bulk insert fast
+        added = []
+        with self.transaction():
+            for book in books:
+                self.cursor.execute("""
+                                    INSERT INTO books (
+                                    title, author, pages, current_page, status,
+                                    genre, owned, date_added, date_finished, rating)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                                    self._book_values(book))
+                book.id = self.cursor.lastrowid
+                self._remember(book)
+                added.append(book.id)
+                if len(added) >= 1000: # The ids go to the change event a batch at a time
+                    self._changed("added", added)
+                    added = []
+            self._changed("added", added)
 
     # Return all books from the database
     def get_all_books(self):
+        return list(self.iter_books())
 
-        # Select all books from the table
-        self.cursor.execute("SELECT * FROM books")
-        rows = self.cursor.fetchall()
-        return [self._row_to_book(row) for row in rows]
+    # Goes through the books one at a time, the rows are read batch_size at a time so the whole table is never in memory
+    # With columns only those columns are read and the rows are given as sqlite3.Row instead of Book objects
+    def iter_books(self, columns=None, batch_size=500):
+        yield from self._iter_rows(f"SELECT {self._select_list(columns)} FROM books ORDER BY id", [],
+                                   columns, batch_size)
+
+    # Same as search but streams the results like iter_books
+    def iter_search(self, query="", title="", author="", genre="", columns=None, batch_size=500):
+        sql, params = self._search_sql(query, title, author, genre, columns=columns)
+        yield from self._iter_rows(sql, params, columns, batch_size)
+
+    # Column list of a SELECT, only names of the books table are allowed
+    def _select_list(self, columns, table="books"):
+        if columns is None:
+            return f"{table}.*"
+        if not columns:
+            raise ValueError(f"No columns requested, use some of {Book.FIELDS} or None for whole books")
+        unknown = [column for column in columns if column not in Book.FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown columns: {unknown}, use some of {Book.FIELDS}")
+        return ", ".join(f"{table}.{column}" for column in columns)
+
+    # Runs the query on its own cursor, so other queries can be made while going through the rows
+    def _iter_rows(self, sql, params, columns, batch_size):
+        cursor = self.connect.cursor()
+        if self.query_stats is not None:
+            cursor = InstrumentedCursor(cursor, self.query_stats) # The batches are timed as they are read
+        cursor.execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                if columns is None:
+                    for row in rows:
+                        yield self._row_to_book(row)
+                else:
+                    yield from rows
+        finally:
+            cursor.close()
     
     # Update existing information 
+    # The book can be an edited copy, the loaded object of the same book gets its values when the write is saved
     def update(self, book):
-        owned = 1 if book.owned else 0
-
         # Update the table with the given inputs
-        self.cursor.execute("""
-                            UPDATE books
-                            SET
-                                title = ?,
-                                author = ?,
-                                pages = ?,
-                                current_page = ?,
-                                status = ?,
-                                genre = ?,
-                                owned = ?,
-                                date_added = ?,
-                                date_finished = ?,
-                                rating = ?
-                            WHERE id = ?""",
-                            (
-                                book.title,
-                                book.author,
-                                book.pages,
-                                book.current_page,
-                                book.status,
-                                book.genre,
-                                owned,
-                                book.date_added,
-                                book.date_finished,
-                                book.rating,
-                                book.id
-                            ))
-        
-        self.connect.commit()
+        self.cursor.execute(UPDATE_SQL, (*self._book_values(book), book.id))
+        self._pending_books.append(book)
+        self._changed("updated", [book.id])
+        self._commit()
+
+    # Update many books with one statement and one commit
+    def update_many(self, books):
+        books = list(books)
+        with self.transaction():
+            self.cursor.executemany(UPDATE_SQL, [(*self._book_values(book), book.id) for book in books])
+            self._pending_books.extend(books)
+            self._changed("updated", [book.id for book in books])
 
     # Delete certain book from the database by index
     def delete_book(self, book_id):
         self.cursor.execute("DELETE FROM books WHERE id = ?",
                             (book_id,)
                             )
-        self.connect.commit()
+        self._books.pop(book_id, None)
+        self._changed("deleted", [book_id])
+        self._commit()
+
+    # Delete many books by id with one statement and one commit
+    def delete_many(self, book_ids):
+        book_ids = list(book_ids)
+        with self.transaction():
+            self.cursor.executemany("DELETE FROM books WHERE id = ?",
+                                    [(book_id,) for book_id in book_ids])
+            for book_id in book_ids:
+                self._books.pop(book_id, None)
+            self._changed("deleted", book_ids)
 
     # Delete all books from the database keeping the table and incrementing id (Not implemened yet on the GUI)
     def clear_books(self):
         self.cursor.execute("DELETE FROM books")
-        self.connect.commit()
+        self._books.clear()
+        self._pending_changes["reset"] = True
+        self._commit()
 
     # Delete the entire database and start from scratch (Not implemened yet on the GUI)
     def reset_database(self):
         self.cursor.execute("DROP TABLE books")
-        self.connect.commit()
-        self._initialize_datebase()
-
-    # Search for a book by name, author, genre
-    def search(self, query):
-        wildcard = f"%{query}%"
+        self.cursor.execute("DROP TABLE IF EXISTS books_fts")
+        self._books.clear()
+        self._pending_changes["reset"] = True
+        self._commit()
+        self._initialize_database(force=True)
 
-        self.cursor.execute("""
-                            SELECT * FROM books
-                            WHERE
-                                title LIKE ?
-                                OR author LIKE ?
-                                OR genre LIKE ?
-                            """, (wildcard, wildcard, wildcard))
+    # Search for a book by name, author, genre using the full text index
+    # query is searched from all three, title, author and genre only from their own column.
+    # Every word given has to match the start of a word in the book (prefix search), so "harr pot"
+    # finds "Harry Potter". Results are ordered by relevance, best first. limit gives only the first
+    # results, search_page goes through them a page at a time. ids limits the search to the given books,
+    # for checking whether new books match the search
+    def search(self, query="", title="", author="", genre="", limit=None, ids=None):
+        sql, params = self._search_sql(query, title, author, genre, limit, ids)
+        self.cursor.execute(sql, params)
         rows = self.cursor.fetchall()
         return [self._row_to_book(row) for row in rows]
+
+    # One page of the search that goes on from where the previous page ended, returns (books, cursor)
+    # after is the cursor of the previous page and None for the first page. The cursor is the id of the
+    # last book, with search words (rank, id) of the last match, and None when there are no more pages.
+    # The page starts right after the cursor instead of skipping rows with OFFSET, so a page far down
+    # the list costs the same as the first one
+    def search_page(self, query="", title="", author="", genre="", limit=200, after=None):
+        sql, params = self._search_sql(query, title, author, genre, limit, after=after, ranked=True)
+        self.cursor.execute(sql, params)
+        rows = self.cursor.fetchall()
+        cursor = None
+        if len(rows) == limit:
+            last = rows[-1]
+            cursor = (last["search_rank"], last["id"]) if "search_rank" in last.keys() else last["id"]
+        return [self._row_to_book(row) for row in rows], cursor
+
+    # SQL and parameters of a search, the columns are chosen like in iter_books
+    # after continues from the cursor of search_page, ranked adds the rank of the matches as search_rank
+    def _search_sql(self, query="", title="", author="", genre="", limit=None, ids=None, columns=None,
+                    after=None, ranked=False):
+        match = self._match_expression(query, title, author, genre)
+        select = self._select_list(columns)
+        conditions = []
+        params = []
+        # The ids go as one JSON array, a parameter for each id would go over the 999 variables
+        # that SQLite before 3.32 allows in one statement
+        if ids is not None:
+            conditions.append("books.id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([int(book_id) for book_id in ids]))
+
+        # Without any search words every book is returned
+        if match is None:
+            if after is not None:
+                conditions.append("books.id > ?")
+                params.append(after)
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            sql = f"SELECT {select} FROM books{where} ORDER BY books.id"
+        else:
+            if after is not None:
+                conditions.append("(books_fts.rank > ? OR (books_fts.rank = ? AND books.id > ?))")
+                params.extend((after[0], after[0], after[1]))
+            if ranked:
+                select += ", books_fts.rank AS search_rank"
+            sql = f"""
+                  SELECT {select} FROM books_fts
+                  JOIN books ON books.id = books_fts.rowid
+                  WHERE {" AND ".join(["books_fts MATCH ?", *conditions])}
+                  ORDER BY books_fts.rank, books.id"""
+            params.insert(0, match)
+
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, params
+
+    # Builds the FTS5 query from the search texts, None if there are no words to search for
+    def _match_expression(self, query="", title="", author="", genre=""):
+        terms = []
+        for column, text in ((None, query), ("title", title), ("author", author), ("genre", genre)):
+            for word in text.split():
+                if not any(ch.isalnum() for ch in word): # Punctuation alone is not indexed
+                    continue
+                # Quoted so that the words are never read as FTS5 operators, * makes it a prefix search
+                phrase = '"' + word.replace('"', '""') + '"*'
+                terms.append(f"{column} : {phrase}" if column else phrase)
+        if not terms:
+            return None
+        return " AND ".join(terms)
     
     # Next few methods are for statistics
     # Count all books
@@ -184,27 +488,41 @@ class BookRepository:
         return self.cursor.fetchone()[0]
     
     # Fetch full list of owned books
+    # All the stats come from one pass over the table and are kept until the next write through
+    # the repository, so reloading the list without changes does not touch the database
+    # (writes made by other programs to the same file are not noticed)
     def get_stats(self):
-        return {
-            "total_books": self.count_books(),
-            "owned": self.count_owned(),
-            "not_owned": self.count_not_owned(),
-            "finished": self.count_by_status("READ"),
-            "unread": self.count_by_status("UNREAD"),
-            "reading": self.count_by_status("READING"),
-            "pages_read": self.total_pages_read(),
-            "average_rating": self.average_rating()
-        }
+        stats = self._cache.get("stats")
+        if stats is None:
+            self.cursor.execute("""
+                                SELECT
+                                    COUNT(*) AS total_books,
+                                    COALESCE(SUM(owned = 1), 0) AS owned,
+                                    COALESCE(SUM(owned = 0), 0) AS not_owned,
+                                    COALESCE(SUM(status = 'READ'), 0) AS finished,
+                                    COALESCE(SUM(status = 'UNREAD'), 0) AS unread,
+                                    COALESCE(SUM(status = 'READING'), 0) AS reading,
+                                    COALESCE(SUM(current_page), 0) AS pages_read,
+                                    AVG(rating) AS average_rating
+                                FROM books""")
+            stats = dict(self.cursor.fetchone())
+            self._cache["stats"] = stats
+        return dict(stats)
     
-    # Next few methods for yearly stats (Not implemened yet on the GUI)
+    # Next few methods for yearly stats
+    # The years are matched with a range of dates (from January 1st to the next January 1st) so that
+    # the index on (status, date_finished) can be used instead of reading every row
+    def _year_bounds(self, year):
+        return f"{int(year):04d}-01-01", f"{int(year) + 1:04d}-01-01"
+
     # Count how many books I read in a given year
     def yearly_books(self, year):
         self.cursor.execute("""
                             SELECT COUNT(*)
                             FROM books
                             WHERE status = 'READ'
-                                AND strftime('%Y', date_finished) = ?
-                            """, (str(year),))
+                                AND date_finished >= ? AND date_finished < ?
+                            """, self._year_bounds(year))
         return self.cursor.fetchone()[0]
     
     # Count how many pages I read in a given year
@@ -213,8 +531,8 @@ class BookRepository:
                             SELECT SUM(pages)
                             FROM books
                             WHERE status = 'READ'
-                                AND strftime('%Y', date_finished) = ?
-                            """, (str(year),))
+                                AND date_finished >= ? AND date_finished < ?
+                            """, self._year_bounds(year))
         result = self.cursor.fetchone()[0]
         return result if result else 0
     
@@ -224,9 +542,9 @@ class BookRepository:
                             SELECT owned, COUNT(*) AS count
                             FROM books
                             WHERE status = 'READ'
-                                AND strftime('%Y', date_finished) = ?
+                                AND date_finished >= ? AND date_finished < ?
                             GROUP BY owned
-                            """, (str(year),))
+                            """, self._year_bounds(year))
         rows = self.cursor.fetchall()
 
         breakdown = {"owned": 0, "not_owned": 0}
@@ -238,24 +556,77 @@ class BookRepository:
 
         return breakdown
     
-    # Average rating in a given year
+    # Average rating of the rated books finished in a given year
     def yearly_avg_rating(self, year):
         self.cursor.execute("""
                             SELECT AVG(rating)
                             FROM books
                             WHERE rating IS NOT NULL
-                                AND strftime('%Y', date_finished) = ?
-                            """, (str(year),))
+                                AND date_finished >= ? AND date_finished < ?
+                            """, self._year_bounds(year))
         return self.cursor.fetchone()[0]
     
     # Yearly total stats
     def yearly_summary(self, year):
+        year = int(year)
+        return self.summary_by_year(range(year, year + 1))[0]
+
+    # Yearly stats for every year in the range (for example range(2016, 2026)) from one grouped query
+    # Without a range returns the years that have finished books. Every number, also the average rating,
+    # is over the books with status READ, unlike yearly_avg_rating which averages every rated book
+    # finished that year. Results are cached until the next write like get_stats
+    def summary_by_year(self, years=None):
+        if years is not None:
+            years = tuple(years) # Every year is in the key, a range with a step gives only its own years
+            if not years:
+                return []
+        key = ("years", years)
+        summaries = self._cache.get(key)
+        if summaries is None:
+            sql = """
+                  SELECT
+                      substr(date_finished, 1, 4) AS year,
+                      COUNT(*) AS books_finished,
+                      COALESCE(SUM(pages), 0) AS pages_read,
+                      SUM(owned = 1) AS owned,
+                      SUM(owned = 0) AS not_owned,
+                      AVG(rating) AS average_rating
+                  FROM books
+                  WHERE status = 'READ'
+                      AND date_finished IS NOT NULL"""
+            params = ()
+            if years is not None:
+                sql += " AND date_finished >= ? AND date_finished < ?"
+                params = (self._year_bounds(min(years))[0], self._year_bounds(max(years))[1])
+            sql += " GROUP BY year ORDER BY year"
+            self.cursor.execute(sql, params)
+
+            by_year = {}
+            for row in self.cursor.fetchall():
+                by_year[int(row["year"])] = {
+                    "year": int(row["year"]),
+                    "books_finished": row["books_finished"],
+                    "pages_read": row["pages_read"],
+                    "ownership": {"owned": row["owned"], "not_owned": row["not_owned"]},
+                    "average_rating": row["average_rating"]
+                }
+
+            # Years of the range without finished books get zeros
+            if years is not None:
+                summaries = [by_year.get(year) or self._empty_year(year) for year in years]
+            else:
+                summaries = list(by_year.values())
+            self._cache[key] = summaries
+        return [dict(summary, ownership=dict(summary["ownership"])) for summary in summaries]
+
+    # Stats of a year without finished books
+    def _empty_year(self, year):
         return {
             "year": year,
-            "books_finished": self.yearly_books(year),
-            "pages_read": self.yearly_pages(year),
-            "ownership": self.yearly_ownership_breakdown(year),
-            "average_rating": self.yearly_avg_rating(year)
+            "books_finished": 0,
+            "pages_read": 0,
+            "ownership": {"owned": 0, "not_owned": 0},
+            "average_rating": None
         }
     
     # Close the database
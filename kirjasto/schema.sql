@@ -13,4 +13,36 @@ CREATE TABLE IF NOT EXISTS books (
     date_added TEXT, -- Not added yet to the GUI
     date_finished TEXT, -- Not added yet to the GUI
     rating INTEGER 
-);
\ No newline at end of file
+);
+
+-- index for the yearly stats, which look for read books finished between two dates
+CREATE INDEX IF NOT EXISTS idx_books_status_finished ON books(status, date_finished);
+
+-- full text index of the searchable columns, the text itself is read from the books table
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    title,
+    author,
+    genre,
+    content='books',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', -- case and accent insensitive
+    prefix='2 3' -- extra indexes for quick prefix searches while typing
+);
+
+-- triggers keep the index in sync with the books table
+CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+    INSERT INTO books_fts(rowid, title, author, genre)
+    VALUES (new.id, new.title, new.author, new.genre);
+END;
+
+CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+    INSERT INTO books_fts(books_fts, rowid, title, author, genre)
+    VALUES ('delete', old.id, old.title, old.author, old.genre);
+END;
+
+CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF title, author, genre ON books BEGIN
+    INSERT INTO books_fts(books_fts, rowid, title, author, genre)
+    VALUES ('delete', old.id, old.title, old.author, old.genre);
+    INSERT INTO books_fts(rowid, title, author, genre)
+    VALUES (new.id, new.title, new.author, new.genre);
+END;
\ No newline at end of file
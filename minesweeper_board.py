@@ -0,0 +1,446 @@
+# Minesweeper board engine without any user interface
+# Used by the pygame game in the Minesweeper script and by the headless tools
+
+# Imports
+import random
+import time
+
+# Translation table that turns adjacent mine counts to 0 for empty cells and 1 for numbered cells
+WALL_TABLE = bytes([0] + [1] * 255)
+
+# Counts the adjacent mines of every cell of a rows x columns grid at once by summing shifted copies of the mine mask
+# The mask is read as one big integer with one byte per cell, so shifting by 8 bits moves
+# every cell one column and shifting by 8 * columns bits moves every cell one row.
+# A byte never goes over 9 so the sums do not carry over to the neighbouring cells
+# Returns the counts as a bytearray, mine cells get zero
+def count_adjacent(mines, rows, columns):
+    size = rows * columns
+    full = (1 << (8 * size)) - 1 # Keeps the shifted values inside the board
+
+    # Masks that cut the neighbours that would wrap around from the other edge of the board
+    not_first_col = int.from_bytes((b"\x00" + b"\xff" * (columns - 1)) * rows, "big")
+    not_last_col = int.from_bytes((b"\xff" * (columns - 1) + b"\x00") * rows, "big")
+
+    mask = int.from_bytes(mines, "big")
+
+    # Mines in the cell itself and on its left and right
+    row_sums = mask + ((mask >> 8) & not_first_col) + ((mask << 8) & full & not_last_col)
+
+    # Add the row sums from the rows above and below
+    counts = row_sums + (row_sums >> (8 * columns)) + ((row_sums << (8 * columns)) & full)
+
+    # Mine cells keep zero like with the loop
+    counts &= ~(mask * 0xff)
+    return bytearray(counts.to_bytes(size, "big"))
+
+# Define a class that gives a view to a single cell of the board
+# The cell state itself lives in the flat arrays of the board, this only points to it
+class Cell:
+    __slots__ = ("board", "index")
+
+    def __init__(self, board, index):
+        self.board = board # Board the cell belongs to
+        self.index = index # Flat index of the cell, row * columns + col
+
+    # Is this cell a mine, boolean
+    @property
+    def is_mine(self):
+        return self.board.mines[self.index] == 1
+
+    # Is this cell revealed, boolean
+    @property
+    def is_revealed(self):
+        return self.board.revealed[self.index] == 1
+
+    # Is this cell flagged, boolean
+    @property
+    def is_flagged(self):
+        return self.board.flagged[self.index] == 1
+
+    # Number of mines in adjacent cells 
+    @property
+    def adjacent_mines(self):
+        return self.board.adjacent[self.index]
+
+    # Reveals the chosen cell
+    def reveal(self):
+        board = self.board
+        if board.revealed[self.index]:
+            return
+        board.revealed[self.index] = 1
+
+        # Keep the counters of the board up to date
+        if board.mines[self.index]:
+            board.revealed_mines += 1
+        else:
+            board.revealed_safe += 1
+
+    # Flags the chocen cell if it's not revealed
+    def toggle_flag(self):
+        if not self.is_revealed:
+            self.board.flagged[self.index] ^= 1
+            self.board.flags_placed += 1 if self.board.flagged[self.index] else -1
+
+    # Sets mine to the chosen cell
+    def set_mine(self):
+        self.board.mines[self.index] = 1
+
+# Row of cell views so that board.grid[row][col] works like with a list of lists
+class BoardRow:
+    __slots__ = ("board", "start")
+
+    def __init__(self, board, row):
+        self.board = board
+        self.start = row * board.columns # Flat index of the first cell on the row
+
+    def __len__(self):
+        return self.board.columns
+
+    def __getitem__(self, col):
+        if col < 0: # Negative indexing like with lists
+            col += self.board.columns
+        if not 0 <= col < self.board.columns:
+            raise IndexError("column out of range")
+        return Cell(self.board, self.start + col)
+
+    def __iter__(self):
+        for index in range(self.start, self.start + self.board.columns):
+            yield Cell(self.board, index)
+
+# Grid of row views, creates the views only when they are asked for
+class BoardGrid:
+    __slots__ = ("board",)
+
+    def __init__(self, board):
+        self.board = board
+
+    def __len__(self):
+        return self.board.rows
+
+    def __getitem__(self, row):
+        if row < 0: # Negative indexing like with lists
+            row += self.board.rows
+        if not 0 <= row < self.board.rows:
+            raise IndexError("row out of range")
+        return BoardRow(self.board, row)
+
+    def __iter__(self):
+        for row in range(self.board.rows):
+            yield BoardRow(self.board, row)
+
+# Class called board that creates the grid and handles mine placement and counting adjacent
+# The cell states are stored in flat bytearrays (one byte per cell) indexed by row * columns + col
+# so that even very large boards stay small in memory and quick to create
+class Board:
+    # check_counters=True compares the counters to a full scan of the board after every reveal and flag (for testing)
+    # The mines are placed on the first reveal, away from the clicked cell. The same seed gives the same
+    # mines for the same first click, without a seed a random one is picked and kept in board.seed
+    def __init__(self, rows, columns, mine_count, check_counters=False, seed=None):
+
+        # Initialize the variables
+        self.rows = rows
+        self.columns = columns
+        self.mine_count = mine_count
+        self.size = rows * columns
+
+        # Own random generator so that games can be replayed from the seed
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.mines_placed = False
+
+        # Packed cell states, 0/1 for the booleans and 0-8 for the adjacent mine counts
+        self.mines = bytearray(self.size)
+        self.revealed = bytearray(self.size)
+        self.flagged = bytearray(self.size)
+        self.adjacent = bytearray(self.size)
+
+        # Cell views to the arrays for the callers that use board.grid[row][col]
+        self.grid = BoardGrid(self)
+
+        # Initialize that the game is in progress
+        self.game_over = False
+
+        # Number of safe cells and variable to store the revealed safe cells
+        self.safe_cells = rows * columns - mine_count
+        self.revealed_safe = 0
+
+        # Counters for revealed mines and placed flags, kept up to date by reveal and flag
+        self.revealed_mines = 0
+        self.flags_placed = 0
+        self.check_counters = check_counters
+
+        # Solver for hints, made on the first hint and updated after every reveal from then on
+        self.solver = None
+
+        # Counts for the empty board, done again when the mines are placed
+        self.calc_adjacent()
+
+    # Returns the cell view of the given row and column
+    def cell(self, row, col):
+        return Cell(self, row * self.columns + col)
+
+    # Function to place the mines, called by the first reveal with the clicked cell
+    # The clicked cell and its neighbours are left without mines when the board has room for it,
+    # otherwise only the clicked cell. Picks the mines without replacement from the allowed cells,
+    # so the time depends on the number of mines and not on how full the board is
+    def place_mine(self, safe_index=None):
+        excluded = []
+        if safe_index is not None:
+            row, col = divmod(safe_index, self.columns)
+            around = [n_row * self.columns + n_col
+                      for n_row in range(max(row - 1, 0), min(row + 2, self.rows))
+                      for n_col in range(max(col - 1, 0), min(col + 2, self.columns))]
+            if self.mine_count <= self.size - len(around):
+                excluded = around
+            elif self.mine_count < self.size:
+                excluded = [safe_index]
+
+        # Sample positions among the allowed cells and move them past the excluded ones in order
+        for index in self.rng.sample(range(self.size - len(excluded)), self.mine_count):
+            for skipped in excluded:
+                if index >= skipped:
+                    index += 1
+            self.mines[index] = 1
+
+        self.mines_placed = True
+        self.calc_adjacent()
+
+    # Function to calculate the number of adjacent mines for every cell
+    # By default counts the whole board at once, batched=False uses the cell by cell loop
+    def calc_adjacent(self, batched=True):
+        if batched:
+            self.calc_adjacent_batched()
+        else:
+            self.calc_adjacent_loop()
+
+        # Numbered cells stop the flood fill, one byte per cell with 1 for numbered and 0 for empty
+        self.walls = self.adjacent.translate(WALL_TABLE)
+
+    # Counts all the cells at once with count_adjacent
+    def calc_adjacent_batched(self):
+        self.adjacent = count_adjacent(self.mines, self.rows, self.columns)
+
+    # Fnction to calculate the number of adjacent mines to a chosen cell
+    def calc_adjacent_loop(self):
+        mine_array = self.mines
+        for row in range(self.rows):
+            for col in range(self.columns):
+                index = row * self.columns + col
+                if mine_array[index]: # If cell has mine, skip it
+                    continue
+                
+                # Count the mines
+                n_mines = 0
+
+                # Check the cells on both sides in rows and columns
+                for r in [-1, 0, 1]:
+                    for c in [-1, 0, 1]:
+                        if r == 0 and c == 0: 
+                            continue # Skip the cell itself
+                        
+                        # Neighbouring cells 
+                        n_row = row + r 
+                        n_col = col + c
+
+                        # Check if the neighbouring cell is mine and increase the mine count
+                        if 0 <= n_row < self.rows and 0 <= n_col < self.columns:
+                            n_mines += mine_array[n_row * self.columns + n_col]
+                self.adjacent[index] = n_mines
+
+    # Function to reveal the wanted cell
+    # Returns the flat indices of the cells that got revealed so that only those need to be redrawn
+    def reveal(self, row, col):
+        changed = []
+        if not (0 <= row < self.rows and 0 <= col < self.columns): # Boundaries
+            return changed
+        
+        index = row * self.columns + col
+
+        # If cell is already revealed or flagged, ignore
+        if self.revealed[index] or self.flagged[index]:
+            return changed
+
+        # First click places the mines around it
+        if not self.mines_placed:
+            self.place_mine(index)
+        
+        # If mine -> game over
+        if self.mines[index]:
+            self.revealed[index] = 1
+            changed.append(index)
+            self.revealed_mines += 1
+            self.game_over = True
+        
+        # Cells next to mines are revealed alone, empty cells open up the whole area around them
+        elif self.adjacent[index] > 0:
+            self.revealed[index] = 1
+            changed.append(index)
+            self.revealed_safe += 1
+        else:
+            self.flood_fill(index, changed)
+
+        if self.solver is not None:
+            self.solver.cells_changed(changed)
+        if self.check_counters:
+            self.verify_counters()
+        return changed
+
+    # Reveals the connected area of empty cells and the numbered cells around it without recursion
+    # Works one horizontal run of empty cells at a time: the run is found and revealed with bytearray
+    # searches and slicing, then the rows above and below it are scanned for numbered cells to
+    # reveal and for further empty runs to push to the stack. Every cell is handled only once
+    def flood_fill(self, start, changed):
+        columns = self.columns
+        walls = self.walls
+        revealed = self.revealed
+        flagged = self.flagged
+
+        # Stack of (first, end) index ranges inside runs of empty cells still to be opened
+        stack = [(start, start + 1)]
+        while stack:
+            pos, stop = stack.pop()
+            while pos < stop:
+
+                # First hidden cell of the range, flagged cells stop the fill like with clicking
+                pos = revealed.find(0, pos, stop)
+                if pos == -1:
+                    break
+                if flagged[pos]:
+                    pos += 1
+                    continue
+
+                # Widen the run both ways until a numbered, revealed or flagged cell or the board edge
+                row_start = pos - pos % columns
+                row_end = row_start + columns
+                left = row_start
+                right = row_end
+                for array in (walls, revealed, flagged):
+                    found = array.rfind(1, left, pos)
+                    if found != -1:
+                        left = found + 1
+                    found = array.find(1, pos, right)
+                    if found != -1:
+                        right = found
+
+                # Reveal the whole run at once
+                count = right - left
+                revealed[left:right] = b"\x01" * count
+                changed.extend(range(left, right))
+                self.revealed_safe += count
+
+                # Numbered cells at both ends of the run
+                for edge in (left - 1, right):
+                    if row_start <= edge < row_end and walls[edge] and not revealed[edge] and not flagged[edge]:
+                        revealed[edge] = 1
+                        changed.append(edge)
+                        self.revealed_safe += 1
+
+                # Neighbouring cells of the run on the rows above and below, corners included
+                low = left - 1 if left > row_start else left
+                high = right + 1 if right < row_end else right
+                for offset in (-columns, columns):
+                    n_low = low + offset
+                    n_high = high + offset
+                    if n_low < 0 or n_high > self.size: # Top and bottom rows
+                        continue
+
+                    n_pos = n_low
+                    while n_pos < n_high:
+                        # Numbered cells are revealed right away
+                        if walls[n_pos]:
+                            if not revealed[n_pos] and not flagged[n_pos]:
+                                revealed[n_pos] = 1
+                                changed.append(n_pos)
+                                self.revealed_safe += 1
+                            n_pos += 1
+
+                        # Empty runs are pushed to the stack and opened later
+                        else:
+                            n_end = walls.find(1, n_pos, n_high)
+                            if n_end == -1:
+                                n_end = n_high
+                            stack.append((n_pos, n_end))
+                            n_pos = n_end
+                pos = right
+
+    # Function to flag the wanted cell
+    # Returns the flat indices of the changed cells like reveal does
+    def flag(self, row, col):
+        # Toggle the flag if the cell is not revealed
+        index = row * self.columns + col
+        if self.revealed[index]:
+            return []
+        self.flagged[index] ^= 1
+        self.flags_placed += 1 if self.flagged[index] else -1
+
+        if self.check_counters:
+            self.verify_counters()
+        return [index]
+
+    # Returns the solver of the board, made on the first call
+    def get_solver(self):
+        if self.solver is None:
+            from minesweeper_solver import Solver # Imported only when hints are used
+            self.solver = Solver(self)
+        return self.solver
+
+    # Next cell to click as (row, col, mine probability) from what is visible on the board
+    def hint(self):
+        return self.get_solver().hint()
+
+    # Function to determine when the game ends
+    # The game is won when every safe cell is revealed, so the counter is enough
+    def end(self):
+        return self.revealed_safe == self.safe_cells
+
+    # Number of safe cells still to be revealed
+    def remaining_safe(self):
+        return self.safe_cells - self.revealed_safe
+
+    # Number of mines left according to the flags, can go negative with too many flags
+    def mines_left(self):
+        return self.mine_count - self.flags_placed
+
+    # Counts everything again from the arrays and checks that the counters agree with the scan
+    def verify_counters(self):
+        revealed_safe = 0
+        revealed_mines = 0
+        for is_mine, is_revealed in zip(self.mines, self.revealed):
+            if is_revealed:
+                if is_mine:
+                    revealed_mines += 1
+                else:
+                    revealed_safe += 1
+        flags_placed = self.flagged.count(1)
+
+        if (revealed_safe, revealed_mines, flags_placed) != (self.revealed_safe, self.revealed_mines, self.flags_placed):
+            raise AssertionError(
+                f"Board counters out of sync: revealed safe {self.revealed_safe} (scan {revealed_safe}), "
+                f"revealed mines {self.revealed_mines} (scan {revealed_mines}), "
+                f"flags {self.flags_placed} (scan {flags_placed})")
+
+
+# Times the cell by cell and the batched adjacency counts on boards of growing size
+def benchmark_adjacent(sizes=(16, 64, 256, 512, 1024), density=0.15, repeats=3):
+    print(f"{'size':>11} {'loop (s)':>10} {'batched (s)':>12} {'speedup':>9}")
+    for size in sizes:
+        board = Board(size, size, int(size * size * density), seed=size)
+        board.place_mine()
+
+        # Best of the repeats for both ways
+        timings = []
+        for batched in (False, True):
+            best = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                board.calc_adjacent(batched=batched)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+        loop_time, batched_time = timings
+        print(f"{size:>5}x{size:<5} {loop_time:>10.4f} {batched_time:>12.4f} {loop_time / batched_time:>8.1f}x")
+
+
+# Run the adjacency benchmark with: python minesweeper_board.py
+if __name__ == "__main__":
+    benchmark_adjacent()
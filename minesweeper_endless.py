@@ -0,0 +1,167 @@
+# Endless Minesweeper board that has no edges
+# The world is split into square chunks. The mines of a chunk are made from the seed and the chunk
+# coordinates only when a reveal reaches it, so the same seed always gives the same world and memory
+# grows only with the explored area. Cells are addressed with world coordinates (x, y) that can be negative
+
+# Imports
+import random
+from collections import deque
+from minesweeper_board import WALL_TABLE, count_adjacent
+
+
+# State of one explored chunk, flat bytearrays indexed by local_y * chunk_size + local_x like in Board
+class Chunk:
+    __slots__ = ("mines", "adjacent", "walls", "revealed", "flagged")
+
+    def __init__(self, mines, adjacent):
+        self.mines = mines
+        self.adjacent = adjacent
+        self.walls = adjacent.translate(WALL_TABLE) # 1 for numbered cells like board.walls
+        self.revealed = bytearray(len(mines))
+        self.flagged = bytearray(len(mines))
+
+
+class EndlessBoard:
+    # density is the share of mines in each chunk. Below MIN_DENSITY one reveal can open a huge empty area,
+    # at 0.1 a start opened over 150 000 cells while at 0.12 the biggest was a few thousand
+    MIN_DENSITY = 0.12
+
+    # The cells around (0, 0) never have mines, the game starts by revealing (0, 0)
+    def __init__(self, seed=None, density=0.16, chunk_size=32):
+        if density < self.MIN_DENSITY:
+            raise ValueError(f"density must be at least {self.MIN_DENSITY}")
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.density = density
+        self.chunk_size = chunk_size
+        self.mines_per_chunk = round(density * chunk_size * chunk_size)
+
+        # Explored chunks by (chunk x, chunk y), and the mines of the chunks next to them
+        # The neighbours only need their mines to count the numbers on the edges of the explored chunks
+        self.chunks = {}
+        self.mine_chunks = {}
+
+        # Counters like in Board, there is no winning so the revealed safe cells are the score
+        self.game_over = False
+        self.revealed_safe = 0
+        self.revealed_mines = 0
+        self.flags_placed = 0
+
+    # Mines of a chunk, made from the seed on the first call
+    # The random generator is seeded with the seed and the chunk coordinates, so the chunks can be made in any order
+    def chunk_mines(self, cx, cy):
+        key = (cx, cy)
+        mines = self.mine_chunks.get(key)
+        if mines is not None:
+            return mines
+
+        size = self.chunk_size
+        rng = random.Random(f"{self.seed}:{cx}:{cy}")
+        mines = bytearray(size * size)
+        for index in rng.sample(range(size * size), self.mines_per_chunk):
+            mines[index] = 1
+
+        # Keep the start area around (0, 0) free of mines
+        for y in (-1, 0, 1):
+            for x in (-1, 0, 1):
+                if (x // size, y // size) == key:
+                    mines[(y % size) * size + x % size] = 0
+
+        self.mine_chunks[key] = mines
+        return mines
+
+    # State of a chunk, made when a reveal or a flag first reaches it
+    # The numbers are counted on the chunk with a one cell border taken from the neighbouring chunks
+    def chunk(self, cx, cy):
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            return chunk
+
+        size = self.chunk_size
+        padded_size = size + 2
+        padded = bytearray(padded_size * padded_size)
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                mines = self.chunk_mines(cx + dx, cy + dy)
+
+                # Part of the neighbour that lands inside the padded area
+                x_start, x_stop = {-1: (size - 1, size), 0: (0, size), 1: (0, 1)}[dx]
+                y_start, y_stop = {-1: (size - 1, size), 0: (0, size), 1: (0, 1)}[dy]
+                for y in range(y_start, y_stop):
+                    target = (y + 1 + dy * size) * padded_size + x_start + 1 + dx * size
+                    padded[target:target + x_stop - x_start] = mines[y * size + x_start:y * size + x_stop]
+
+        counts = count_adjacent(padded, padded_size, padded_size)
+        adjacent = bytearray()
+        for y in range(1, size + 1):
+            adjacent += counts[y * padded_size + 1:y * padded_size + 1 + size]
+
+        chunk = Chunk(self.chunk_mines(cx, cy), adjacent)
+        self.chunks[key] = chunk
+        return chunk
+
+    # Chunk and local index of a world cell, the chunk is made if needed
+    def locate(self, x, y):
+        size = self.chunk_size
+        return self.chunk(x // size, y // size), (y % size) * size + x % size
+
+    # What the game needs to draw a cell: None for hidden cells, "flag", "mine" or the adjacent count
+    # Cells of chunks that are not explored are hidden, nothing is made for them
+    def cell_view(self, x, y):
+        size = self.chunk_size
+        chunk = self.chunks.get((x // size, y // size))
+        if chunk is None:
+            return None
+        index = (y % size) * size + x % size
+        if chunk.revealed[index]:
+            return "mine" if chunk.mines[index] else chunk.adjacent[index]
+        if chunk.flagged[index]:
+            return "flag"
+        return None
+
+    # Reveals the cell, empty cells open the area around them over the chunk edges
+    # Returns the world coordinates of the revealed cells
+    def reveal(self, x, y):
+        chunk, index = self.locate(x, y)
+        if chunk.revealed[index] or chunk.flagged[index]:
+            return []
+
+        if chunk.mines[index]:
+            chunk.revealed[index] = 1
+            self.revealed_mines += 1
+            self.game_over = True
+            return [(x, y)]
+
+        # Breadth first over the empty cells, numbered cells are revealed but not opened further
+        size = self.chunk_size
+        changed = []
+        queue = deque([(x, y)])
+        chunk.revealed[index] = 1
+        while queue:
+            x, y = queue.popleft()
+            changed.append((x, y))
+            chunk, index = self.locate(x, y)
+            if chunk.walls[index]:
+                continue
+            for n_y in (y - 1, y, y + 1):
+                for n_x in (x - 1, x, x + 1):
+                    n_chunk = self.chunks.get((n_x // size, n_y // size)) or self.chunk(n_x // size, n_y // size)
+                    n_index = (n_y % size) * size + n_x % size
+                    if not n_chunk.revealed[n_index] and not n_chunk.flagged[n_index]:
+                        n_chunk.revealed[n_index] = 1
+                        queue.append((n_x, n_y))
+        self.revealed_safe += len(changed)
+        return changed
+
+    # Flags or unflags the cell if it is not revealed, returns the changed cells like reveal
+    def flag(self, x, y):
+        chunk, index = self.locate(x, y)
+        if chunk.revealed[index]:
+            return []
+        chunk.flagged[index] ^= 1
+        self.flags_placed += 1 if chunk.flagged[index] else -1
+        return [(x, y)]
+
+    # Number of chunks in memory, explored and the ones kept only for their mines
+    def loaded_chunks(self):
+        return len(self.chunks), len(self.mine_chunks)
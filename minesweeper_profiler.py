@@ -0,0 +1,97 @@
+# Frame timing for the Minesweeper game loop
+# The loop marks the end of each part of a frame with lap and the profiler adds the time since the
+# previous mark to that part. Time spent waiting for events is not counted. When the profiler is off
+# the game only checks one attribute per frame, so it can be left in
+
+# Imports
+import time
+from collections import deque
+
+# Parts of a frame in the order the loop goes through them
+# The overlay is timed on its own so that drawing the timing does not show up as draw or flip time
+SECTIONS = ("events", "reveal", "draw", "overlay", "flip")
+
+
+class FrameProfiler:
+    # history is the number of frames kept for the percentiles, dump_path is a CSV file that gets a line per frame
+    def __init__(self, history=600, dump_path=None):
+        self.frames = deque(maxlen=history) # (end time, total, {section: seconds}, cascade size)
+        self.current = None # Section times of the frame going on, None between frames
+        self.cascade = 0
+        self.last = 0.0
+
+        # Samples are written as they come so a long session does not fill the memory
+        self.dump = None
+        if dump_path:
+            self.dump = open(dump_path, "w", encoding="utf-8")
+            self.dump.write("time,total_ms," + ",".join(f"{name}_ms" for name in SECTIONS) + ",cascade\n")
+        self.enabled = self.dump is not None
+
+    # Returns the profiler when it is on and None when it is off, the loop checks this once per frame
+    def active(self):
+        return self if self.enabled else None
+
+    # Turns the timing on or off, the frame going on is dropped
+    def set_enabled(self, enabled):
+        self.enabled = enabled or self.dump is not None
+        self.current = None
+
+    # Starts timing after the wait for events, a frame without drawing goes on until the next drawn one
+    def begin_frame(self):
+        if self.current is None:
+            self.current = dict.fromkeys(SECTIONS, 0.0)
+            self.cascade = 0
+        self.last = time.perf_counter()
+
+    # Adds the time since the previous mark to the section
+    def lap(self, name):
+        now = time.perf_counter()
+        if self.current is not None:
+            self.current[name] += now - self.last
+        self.last = now
+
+    # Number of cells a reveal opened during the frame
+    def add_cascade(self, size):
+        self.cascade += size
+
+    # Ends the frame after the display has been updated
+    def end_frame(self):
+        if self.current is None:
+            return
+        now = time.perf_counter()
+        total = sum(self.current.values())
+        self.frames.append((now, total, self.current, self.cascade))
+        if self.dump:
+            self.dump.write(f"{now:.6f},{total * 1000:.4f}," +
+                            ",".join(f"{self.current[name] * 1000:.4f}" for name in SECTIONS) +
+                            f",{self.cascade}\n")
+        self.current = None
+
+    # Frames drawn during the last second
+    def fps(self):
+        if not self.frames:
+            return 0.0
+        newest = self.frames[-1][0]
+        return float(sum(1 for frame in self.frames if newest - frame[0] <= 1.0))
+
+    # Frame times in milliseconds at the given shares (0-1) of the kept frames
+    def percentiles(self, shares=(0.5, 0.95, 0.99)):
+        totals = sorted(frame[1] for frame in self.frames)
+        if not totals:
+            return [0.0 for _ in shares]
+        return [totals[min(int(share * len(totals)), len(totals) - 1)] * 1000 for share in shares]
+
+    # Text lines for the overlay: FPS and percentiles, and the parts of the last frame
+    def summary_lines(self):
+        p50, p95, p99 = self.percentiles()
+        lines = [f"FPS {self.fps():.0f}  p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f} ms"]
+        if self.frames:
+            _, total, sections, cascade = self.frames[-1]
+            parts = "  ".join(f"{name} {sections[name] * 1000:.2f}" for name in SECTIONS)
+            lines.append(f"last {total * 1000:.2f} ms: {parts}  cascade {cascade}")
+        return lines
+
+    def close(self):
+        if self.dump:
+            self.dump.close()
+            self.dump = None
@@ -0,0 +1,198 @@
+# Compact replay logs of Minesweeper games and a headless replayer for them
+# A game is stored as the board size, mine count and seed followed by its clicks. Every number is a
+# varint (7 bits per byte, high bit set when more bytes follow), so most clicks take 3-4 bytes.
+# The seed can be negative, so it is zigzag encoded (0, -1, 1, -2... -> 0, 1, 2, 3...) before the varint.
+# Games are written one after another and logs can be appended to or joined with cat, the reader
+# streams them a block at a time so archives of any size can be replayed
+# Example: python minesweeper_replay.py games.msr --top 10
+
+# Imports
+import argparse
+import time
+from collections import namedtuple
+from minesweeper_board import Board
+
+# Version byte at the start of every game record
+VERSION = 1
+
+# Actions, stored in the two lowest bits of the event together with the cell index
+END = 0
+REVEAL = 1
+FLAG = 2
+
+# One game read from a log, events are (action, cell index, tick in milliseconds from the start)
+GameLog = namedtuple("GameLog", "rows columns mines seed events")
+
+# Result of replaying one game
+ReplayResult = namedtuple("ReplayResult", "seed won lost clicks revealed_safe ticks")
+
+
+# Adds the varint of a non negative integer to the buffer
+def write_varint(buffer, value):
+    if value < 0:
+        raise ValueError(f"Varints are for non negative numbers, got {value}")
+    while value > 0x7f:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+# Maps any integer to a non negative one so that small negative numbers stay short
+def zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+def unzigzag(value):
+    return value >> 1 if value % 2 == 0 else -(value + 1 >> 1)
+
+# Writes games to a binary file while they are played
+# The events of a game are kept in a small buffer and written with one write when the game ends
+class ReplayWriter:
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        self.buffer = None
+        self.last_tick = 0
+
+    # Starts the record of a game on the board
+    def start_game(self, board):
+        if self.buffer is not None:
+            self.end_game()
+        self.buffer = bytearray([VERSION])
+        for value in (board.rows, board.columns, board.mine_count, zigzag(board.seed)):
+            write_varint(self.buffer, value)
+        self.last_tick = 0
+
+    # Records one click, the tick is stored as the time from the previous click
+    def record(self, action, index, tick):
+        if self.buffer is None:
+            return
+        write_varint(self.buffer, index << 2 | action)
+        write_varint(self.buffer, max(tick - self.last_tick, 0))
+        self.last_tick = max(tick, self.last_tick)
+
+    # Ends the game and writes it to the file
+    def end_game(self):
+        if self.buffer is None:
+            return
+        self.buffer.append(END)
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer = None
+
+    def close(self):
+        self.end_game()
+        self.file.close()
+
+
+# Reads varints from a binary file a block at a time
+class VarintStream:
+    def __init__(self, file, block_size=65536):
+        self.file = file
+        self.block_size = block_size
+        self.buffer = b""
+        self.pos = 0
+
+    # Next varint, None at the end of the file
+    def read(self):
+        value = 0
+        shift = 0
+        while True:
+            if self.pos >= len(self.buffer):
+                self.buffer = self.file.read(self.block_size)
+                self.pos = 0
+                if not self.buffer:
+                    if shift:
+                        raise ValueError("Replay log ends in the middle of a number")
+                    return None
+            byte = self.buffer[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    # Next varint of a game that has started, the file must not end before it
+    def read_in_game(self):
+        value = self.read()
+        if value is None:
+            raise ValueError("Replay log ends in the middle of a game")
+        return value
+
+# Yields the games of a log file one at a time
+def read_games(path):
+    with open(path, "rb") as f:
+        stream = VarintStream(f)
+        while True:
+            version = stream.read()
+            if version is None:
+                return
+            if version != VERSION:
+                raise ValueError(f"Unknown replay log version {version}")
+            rows, columns, mines, seed = (stream.read_in_game() for _ in range(4))
+            seed = unzigzag(seed)
+
+            events = []
+            tick = 0
+            while True:
+                code = stream.read_in_game()
+                if code == END:
+                    break
+                tick += stream.read_in_game()
+                events.append((code & 3, code >> 2, tick))
+            yield GameLog(rows, columns, mines, seed, events)
+
+
+# Plays the clicks of the log again on a new board with the same seed
+def replay(log):
+    board = Board(log.rows, log.columns, log.mines, seed=log.seed)
+    clicks = 0
+    tick = 0
+    for action, index, tick in log.events:
+        row, col = divmod(index, log.columns)
+        if action == REVEAL:
+            clicks += 1
+            board.reveal(row, col)
+            if board.game_over:
+                break
+        elif action == FLAG:
+            board.flag(row, col)
+    won = board.end() and not board.game_over
+    return ReplayResult(log.seed, won, board.game_over, clicks, board.revealed_safe, tick)
+
+# Replays every game of the log files, yields (log, result)
+def replay_files(paths):
+    for path in paths:
+        for log in read_games(path):
+            yield log, replay(log)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Minesweeper games without a display")
+    parser.add_argument("logs", nargs="+", help="replay log files")
+    parser.add_argument("--top", type=int, default=0, help="print the fastest won games of each board size")
+    parser.add_argument("--list", action="store_true", help="print the result of every game")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    games = wins = losses = 0
+    leaderboard = {} # (rows, columns, mines) -> [(ticks, seed)]
+    for log, result in replay_files(args.logs):
+        games += 1
+        wins += result.won
+        losses += result.lost
+        if args.list:
+            outcome = "won" if result.won else "lost" if result.lost else "unfinished"
+            print(f"{log.rows}x{log.columns}/{log.mines} seed {result.seed}: {outcome} "
+                  f"in {result.clicks} clicks, {result.ticks / 1000:.1f} s")
+        if result.won and args.top:
+            leaderboard.setdefault((log.rows, log.columns, log.mines), []).append((result.ticks, result.seed))
+    elapsed = time.perf_counter() - start
+
+    print(f"games: {games}, won: {wins}, lost: {losses}, unfinished: {games - wins - losses}")
+    print(f"replayed in {elapsed:.3f} s ({games / elapsed if elapsed else 0:.0f} games per second)")
+    for (rows, columns, mines), times in sorted(leaderboard.items()):
+        print(f"--- {rows}x{columns}/{mines} ---")
+        for place, (ticks, seed) in enumerate(sorted(times)[:args.top], 1):
+            print(f"{place}. {ticks / 1000:.1f} s (seed {seed})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# Headless Minesweeper simulations for evaluating board generators and click policies
+# Plays seeded games on many processes without pygame and collects statistics of them
+# Example: python minesweeper_sim.py --games 100000 --difficulty hard --policy random
+
+# Imports
+import argparse
+import importlib
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from minesweeper_board import Board
+
+# Board sizes of the menu difficulties as (rows, columns, mines)
+DIFFICULTIES = {"easy": (8, 8, 10),
+                "medium": (16, 16, 40),
+                "hard": (30, 16, 99)}
+
+
+# Click policies take the board and a random generator and return the (row, col) to reveal next
+# Clicks a random hidden cell
+def random_policy(board, rng):
+    revealed = board.revealed
+    flagged = board.flagged
+
+    # Random tries first, they hit quickly while most of the board is hidden
+    for _ in range(32):
+        index = rng.randrange(board.size)
+        if not revealed[index] and not flagged[index]:
+            return divmod(index, board.columns)
+
+    # Pick from the list of hidden cells when the board is almost cleared
+    hidden = [index for index in range(board.size) if not revealed[index] and not flagged[index]]
+    return divmod(rng.choice(hidden), board.columns)
+
+# Starts from the center of the board and then clicks randomly
+def center_policy(board, rng):
+    if board.revealed_safe == 0:
+        return board.rows // 2, board.columns // 2
+    return random_policy(board, rng)
+
+# Clicks the hint of the solver: a certainly safe cell or the one least likely to be a mine
+# Clicks randomly when the solver has no hint
+def solver_policy(board, rng):
+    hint = board.hint()
+    if hint is None:
+        return random_policy(board, rng)
+    row, col, _ = hint
+    return row, col
+
+# Built in policies by name, other policies can be given as "module:function"
+POLICIES = {"random": random_policy,
+            "center": center_policy,
+            "solver": solver_policy}
+
+# Returns the policy function for the name
+def load_policy(name):
+    if name in POLICIES:
+        return POLICIES[name]
+    if ":" not in name:
+        raise ValueError(f"Unknown policy {name!r}, use one of {sorted(POLICIES)} or module:function")
+    module_name, function_name = name.split(":", 1)
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+# Statistics of many games, the stats from different processes are combined with merge
+class SimulationStats:
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.clicks = 0
+        self.first_click_losses = 0 # Games lost on the very first click
+        self.revealed_safe = 0      # Safe cells revealed over all games
+        self.safe_cells = 0         # Safe cells there were over all games
+        self.cascade_sizes = Counter() # Number of cells revealed by a click -> how many clicks
+
+    # Adds the result of one game
+    def add_game(self, won, cascades, revealed_safe, safe_cells):
+        self.games += 1
+        self.clicks += len(cascades)
+        if won:
+            self.wins += 1
+        elif len(cascades) == 1: # Only when the board is too full to keep the first click safe
+            self.first_click_losses += 1
+        self.revealed_safe += revealed_safe
+        self.safe_cells += safe_cells
+        self.cascade_sizes.update(cascades)
+
+    # Adds the stats of another batch of games
+    def merge(self, other):
+        self.games += other.games
+        self.wins += other.wins
+        self.clicks += other.clicks
+        self.first_click_losses += other.first_click_losses
+        self.revealed_safe += other.revealed_safe
+        self.safe_cells += other.safe_cells
+        self.cascade_sizes.update(other.cascade_sizes)
+
+    # Cascade size that the given share (0-1) of the clicks stay at or below
+    def cascade_percentile(self, share):
+        total = sum(self.cascade_sizes.values())
+        if total == 0:
+            return 0
+        limit = share * total
+        seen = 0
+        for size in sorted(self.cascade_sizes):
+            seen += self.cascade_sizes[size]
+            if seen >= limit:
+                return size
+        return max(self.cascade_sizes)
+
+    # Aggregate numbers as a dictionary
+    def summary(self):
+        cascade_total = sum(size * count for size, count in self.cascade_sizes.items())
+        return {
+            "games": self.games,
+            "wins": self.wins,
+            "win_rate": self.wins / self.games if self.games else 0.0,
+            "first_click_losses": self.first_click_losses,
+            "average_clicks": self.clicks / self.games if self.games else 0.0,
+            "cleared_share": self.revealed_safe / self.safe_cells if self.safe_cells else 0.0,
+            "average_cascade": cascade_total / self.clicks if self.clicks else 0.0,
+            "cascade_p50": self.cascade_percentile(0.5),
+            "cascade_p95": self.cascade_percentile(0.95),
+            "max_cascade": max(self.cascade_sizes) if self.cascade_sizes else 0,
+        }
+
+
+# Plays one game with the seed until it is won or lost
+# Returns (won, cells revealed by each click, revealed safe cells)
+def play_game(rows, columns, mines, seed, policy):
+    board = Board(rows, columns, mines, seed=seed)
+    rng = random.Random(f"policy-{seed}") # Own generator for the policy, separate from the mines
+
+    cascades = []
+    max_clicks = board.size # Stops policies that keep clicking revealed cells
+    while not board.game_over and not board.end() and len(cascades) < max_clicks:
+        row, col = policy(board, rng)
+        cascades.append(len(board.reveal(row, col)))
+    return board.end() and not board.game_over, cascades, board.revealed_safe
+
+# Plays count games with the seeds first_seed, first_seed + 1, ... in one process
+def run_batch(rows, columns, mines, policy_name, first_seed, count):
+    policy = load_policy(policy_name)
+    stats = SimulationStats()
+    safe_cells = rows * columns - mines
+    for seed in range(first_seed, first_seed + count):
+        won, cascades, revealed_safe = play_game(rows, columns, mines, seed, policy)
+        stats.add_game(won, cascades, revealed_safe, safe_cells)
+    return stats
+
+# Plays the games split into batches over a pool of processes, workers=1 plays them in this process
+# The games get the same seeds however many workers there are, so the results can be replayed
+def simulate(games, rows, columns, mines, policy="random", seed=0, workers=None, batch_size=1000):
+    load_policy(policy) # Fail early on a bad policy name
+    batches = [(start, min(batch_size, seed + games - start)) for start in range(seed, seed + games, batch_size)]
+
+    total = SimulationStats()
+    if workers == 1:
+        for start, count in batches:
+            total.merge(run_batch(rows, columns, mines, policy, start, count))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_batch, rows, columns, mines, policy, start, count) for start, count in batches]
+        for future in futures:
+            total.merge(future.result())
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play seeded Minesweeper games without a display and print statistics")
+    parser.add_argument("--games", type=int, default=10000, help="number of games to play")
+    parser.add_argument("--difficulty", choices=sorted(DIFFICULTIES), default="hard", help="board size from the game menu")
+    parser.add_argument("--rows", type=int, help="custom number of rows")
+    parser.add_argument("--columns", type=int, help="custom number of columns")
+    parser.add_argument("--mines", type=int, help="custom number of mines")
+    parser.add_argument("--policy", default="random", help=f"click policy: {', '.join(sorted(POLICIES))} or module:function")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of processes")
+    parser.add_argument("--batch-size", type=int, default=1000, help="games per task sent to a process")
+    parser.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    args = parser.parse_args()
+
+    # Custom sizes override the difficulty
+    rows, columns, mines = DIFFICULTIES[args.difficulty]
+    rows = args.rows or rows
+    columns = args.columns or columns
+    mines = args.mines if args.mines is not None else mines
+
+    start = time.perf_counter()
+    stats = simulate(args.games, rows, columns, mines, policy=args.policy, seed=args.seed,
+                     workers=args.workers, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+
+    summary = stats.summary()
+    summary["board"] = f"{rows}x{columns}/{mines}"
+    summary["seconds"] = elapsed
+    summary["games_per_second"] = stats.games / elapsed if elapsed else 0.0
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for key, value in summary.items():
+            print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+# Minesweeper solver that works only with what the player can see on the board
+# Finds the cells that are certainly safe or certainly mines from the revealed numbers and
+# gives mine probabilities for the rest. It keeps its state between clicks and only looks
+# again at the numbers around the cells that a reveal changed
+
+# Imports
+import math
+from collections import deque
+
+
+# Returns the flat indices of the up to eight neighbours of the cell
+def neighbours(index, rows, columns):
+    row, col = divmod(index, columns)
+    result = []
+    for n_row in (row - 1, row, row + 1):
+        if not 0 <= n_row < rows:
+            continue
+        for n_col in (col - 1, col, col + 1):
+            if 0 <= n_col < columns and (n_row != row or n_col != col):
+                result.append(n_row * columns + n_col)
+    return result
+
+# Logarithm of the binomial coefficient, used to weigh how the rest of the mines fit the other cells
+def log_comb(n, k):
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+class Solver:
+    # max_component limits how many frontier cells are enumerated together for the probabilities
+    def __init__(self, board, max_component=20):
+        self.board = board
+        self.max_component = max_component
+
+        # Cells deduced so far, flat indices of hidden cells
+        self.known_safe = set()
+        self.known_mines = set()
+
+        # Revealed numbered cells that still have undecided hidden neighbours:
+        # cell -> (frozenset of the undecided neighbours, number of mines among them)
+        self.constraints = {}
+
+        # Undecided hidden cell -> the numbered cells whose constraint has it
+        self.cell_constraints = {}
+
+        # Start from everything that is already revealed
+        self.cells_changed([index for index in range(board.size) if board.revealed[index]])
+
+    # Takes in the cells that a reveal changed and updates the deductions from the numbers around them
+    def cells_changed(self, changed):
+        board = self.board
+        revealed = board.revealed
+        dirty = set()
+
+        # Revealed cells are not undecided anymore
+        for index in changed:
+            self.known_safe.discard(index)
+
+        # Newly revealed numbered cells get a constraint
+        walls = board.walls
+        mines = board.mines
+        for index in changed:
+            if walls[index] and not mines[index]:
+                dirty.add(index)
+
+        # Old constraints that had one of the changed cells, looked up from whichever side is smaller
+        if len(changed) < len(self.constraints):
+            for index in changed:
+                dirty.update(self.cell_constraints.get(index, ()))
+        else:
+            for cell, (unknown, _) in self.constraints.items():
+                if any(revealed[n] for n in unknown):
+                    dirty.add(cell)
+
+        self.propagate(dirty)
+
+    # Builds the constraint of a numbered cell again from the board and the known cells
+    def refresh(self, cell):
+        self.drop(cell)
+        board = self.board
+        if not board.revealed[cell] or board.mines[cell]:
+            return
+
+        unknown = []
+        remaining = board.adjacent[cell]
+        for n in neighbours(cell, board.rows, board.columns):
+            if board.revealed[n] or n in self.known_safe:
+                continue
+            if n in self.known_mines:
+                remaining -= 1
+            else:
+                unknown.append(n)
+        if not unknown:
+            return
+
+        unknown = frozenset(unknown)
+        self.constraints[cell] = (unknown, remaining)
+        for n in unknown:
+            self.cell_constraints.setdefault(n, set()).add(cell)
+
+    # Removes the constraint of the cell
+    def drop(self, cell):
+        old = self.constraints.pop(cell, None)
+        if old is None:
+            return
+        for n in old[0]:
+            users = self.cell_constraints.get(n)
+            if users is not None:
+                users.discard(cell)
+                if not users:
+                    del self.cell_constraints[n]
+
+    # Marks cells as known safe or known mines and queues the constraints that had them
+    def mark(self, cells, is_mine, queue, queued):
+        known = self.known_mines if is_mine else self.known_safe
+        for n in cells:
+            if n in self.known_mines or n in self.known_safe:
+                continue
+            known.add(n)
+            for cell in self.cell_constraints.get(n, ()):
+                if cell not in queued:
+                    queued.add(cell)
+                    queue.append(cell)
+
+    # Goes through the changed constraints until nothing more can be deduced
+    # Single cell rules first: all undecided neighbours are safe (no mines left) or all are mines.
+    # Then pairs of overlapping constraints: when one's cells are a subset of the other's,
+    # the difference holds the difference of the mine counts
+    def propagate(self, dirty):
+        queue = deque(dirty)
+        queued = set(dirty)
+        while queue:
+            cell = queue.popleft()
+            queued.discard(cell)
+            self.refresh(cell)
+            constraint = self.constraints.get(cell)
+            if constraint is None:
+                continue
+            unknown, remaining = constraint
+
+            # Single cell rules
+            if remaining == 0:
+                self.mark(unknown, False, queue, queued)
+                continue
+            if remaining == len(unknown):
+                self.mark(unknown, True, queue, queued)
+                continue
+
+            # Subset rule against every constraint sharing a cell with this one
+            others = set()
+            for n in unknown:
+                others.update(self.cell_constraints.get(n, ()))
+            others.discard(cell)
+            for other in others:
+                if other in queued: # Stale, checked again when it comes out of the queue
+                    continue
+                o_unknown, o_remaining = self.constraints[other]
+                if unknown < o_unknown:
+                    rest, rest_mines = o_unknown - unknown, o_remaining - remaining
+                elif o_unknown < unknown:
+                    rest, rest_mines = unknown - o_unknown, remaining - o_remaining
+                else:
+                    continue
+                if rest_mines == 0:
+                    self.mark(rest, False, queue, queued)
+                elif rest_mines == len(rest):
+                    self.mark(rest, True, queue, queued)
+
+    # Known safe cells that can still be clicked
+    def safe_cells(self):
+        flagged = self.board.flagged
+        return sorted(index for index in self.known_safe if not flagged[index])
+
+    # Known mines
+    def mine_cells(self):
+        return sorted(self.known_mines)
+
+    # Groups the undecided frontier cells to sets that share constraints
+    def components(self):
+        seen = set()
+        groups = []
+        for start in self.cell_constraints:
+            if start in seen:
+                continue
+            seen.add(start)
+            group = []
+            queue = deque([start])
+            while queue:
+                n = queue.popleft()
+                group.append(n)
+                for cell in self.cell_constraints[n]:
+                    for other in self.constraints[cell][0]:
+                        if other not in seen:
+                            seen.add(other)
+                            queue.append(other)
+            groups.append(group)
+        return groups
+
+    # Goes through every mine layout of a group of frontier cells that fits the numbers
+    # Returns {mine count: layouts} and {mine count: {cell: layouts where the cell is a mine}}
+    def enumerate_component(self, cells):
+        position = {n: i for i, n in enumerate(cells)}
+        cell_ids = set()
+        for n in cells:
+            cell_ids.update(self.cell_constraints[n])
+
+        # Constraints as lists of positions, and the constraints of each position
+        rules = []
+        rules_of = [[] for _ in cells]
+        for cell in cell_ids:
+            unknown, remaining = self.constraints[cell]
+            members = [position[n] for n in unknown]
+            rules.append([remaining, len(members)]) # Mines still to place, cells still unassigned
+            for i in members:
+                rules_of[i].append(len(rules) - 1)
+
+        assignment = [0] * len(cells)
+        counts = {}
+        cell_counts = {}
+
+        # Depth first search, each rule keeps count of mines still to place and cells still free
+        def search(i, mines):
+            if i == len(cells):
+                counts[mines] = counts.get(mines, 0) + 1
+                per_cell = cell_counts.setdefault(mines, [0] * len(cells))
+                for j, value in enumerate(assignment):
+                    per_cell[j] += value
+                return
+            for value in (0, 1):
+                fits = True
+                for r in rules_of[i]:
+                    rule = rules[r]
+                    rule[0] -= value
+                    rule[1] -= 1
+                    if rule[0] < 0 or rule[0] > rule[1]:
+                        fits = False
+                if fits:
+                    assignment[i] = value
+                    search(i + 1, mines + value)
+                for r in rules_of[i]:
+                    rules[r][0] += value
+                    rules[r][1] += 1
+            assignment[i] = 0
+
+        search(0, 0)
+        return counts, {k: dict(zip(cells, v)) for k, v in cell_counts.items()}
+
+    # Mine probabilities of the frontier and of the rest of the undecided hidden cells
+    # Frontier groups up to max_component cells are enumerated exactly and weighed together with
+    # the number of ways the remaining mines fit the other hidden cells. Bigger groups count as
+    # part of the rest and get its average density
+    # Returns ({frontier cell: probability}, probability of a rest cell, number of rest cells)
+    def frontier_probabilities(self):
+        board = self.board
+        mines_left = board.mine_count - len(self.known_mines)
+
+        # Enumerate the small groups, normalise so that the products stay in float range
+        groups = []
+        frontier = 0
+        for cells in self.components():
+            if len(cells) > self.max_component:
+                continue
+            counts, cell_counts = self.enumerate_component(cells)
+            total = sum(counts.values())
+            if total == 0: # Numbers contradict, can happen only with a broken board
+                continue
+            dist = {k: c / total for k, c in counts.items()}
+            per_cell = {k: {n: c / total for n, c in v.items()} for k, v in cell_counts.items()}
+            groups.append((cells, dist, per_cell))
+            frontier += len(cells)
+
+        # Every other undecided hidden cell, counted from the board counters
+        hidden = board.size - board.revealed_safe - board.revealed_mines
+        rest = hidden - frontier - len(self.known_safe) - len(self.known_mines)
+
+        # Weight of placing the other mines into the rest of the cells
+        def weight(k):
+            left = mines_left - k
+            if left < 0 or left > rest:
+                return None
+            return log_comb(rest, left)
+
+        # Combined mine count distribution of the groups
+        def convolve(dists):
+            result = {0: 1.0}
+            for dist in dists:
+                combined = {}
+                for a, pa in result.items():
+                    for b, pb in dist.items():
+                        combined[a + b] = combined.get(a + b, 0.0) + pa * pb
+                result = combined
+            return result
+
+        total_dist = convolve([dist for _, dist, _ in groups])
+        logs = {k: weight(k) for k in total_dist}
+        valid = [value for value in logs.values() if value is not None]
+        if not valid:
+            return {}, 0.0, 0
+        top = max(valid)
+        scale = {k: math.exp(value - top) for k, value in logs.items() if value is not None}
+        norm = sum(total_dist[k] * scale[k] for k in scale)
+
+        # Each group against the combined distribution of all the other groups
+        result = {}
+        for i, (cells, dist, per_cell) in enumerate(groups):
+            others = convolve([g[1] for j, g in enumerate(groups) if j != i])
+            for n in cells:
+                result[n] = 0.0
+            for k, cell_share in per_cell.items():
+                for j, pj in others.items():
+                    factor = scale.get(k + j)
+                    if factor is None:
+                        continue
+                    for n, share in cell_share.items():
+                        result[n] += share * pj * factor / norm
+
+        # Expected mines in the rest shared evenly
+        rest_chance = 0.0
+        if rest:
+            expected = sum(total_dist[k] * scale[k] * (mines_left - k) for k in scale) / norm
+            rest_chance = expected / rest
+        return result, rest_chance, rest
+
+    # Undecided hidden cells outside the enumerated frontier, in index order
+    def rest_cells(self, frontier):
+        revealed = self.board.revealed
+        index = revealed.find(0)
+        while index != -1:
+            if index not in frontier and index not in self.known_safe and index not in self.known_mines:
+                yield index
+            index = revealed.find(0, index + 1)
+
+    # Mine probability of every hidden cell that is not flagged or decided yet
+    def probabilities(self):
+        result, rest_chance, _ = self.frontier_probabilities()
+        for index in list(self.rest_cells(result)):
+            result[index] = rest_chance
+        flagged = self.board.flagged
+        return {index: p for index, p in result.items() if not flagged[index]}
+
+    # Next cell to click as (row, col, mine probability), None when nothing is left to click
+    # A known safe cell when there is one, otherwise the cell least likely to be a mine
+    def hint(self):
+        columns = self.board.columns
+        flagged = self.board.flagged
+        safe = self.safe_cells()
+        if safe:
+            return (*divmod(safe[0], columns), 0.0)
+
+        # Best frontier cell
+        chances, rest_chance, rest = self.frontier_probabilities()
+        best = None
+        for index, chance in chances.items():
+            if not flagged[index] and (best is None or (chance, index) < (chances[best], best)):
+                best = index
+
+        # First cell of the rest when it is a better bet
+        if rest and (best is None or rest_chance < chances[best]):
+            for index in self.rest_cells(chances):
+                if not flagged[index]:
+                    return (*divmod(index, columns), rest_chance)
+        if best is None:
+            return None
+        return (*divmod(best, columns), chances[best])
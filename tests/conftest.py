@@ -0,0 +1,7 @@
+# The game and the kirjasto modules are run as scripts from their own folders, so both folders go on the import path
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "kirjasto"))
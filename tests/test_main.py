@@ -0,0 +1,25 @@
+# Imports
+import json
+import pytest
+from main import main
+
+
+# The export command writes a JSON array for .json files
+def test_export_json(tmp_path, capsys):
+    db = str(tmp_path / "library.db")
+    main(["--db", db, "add", "Dune", "Frank Herbert", "412", "--genre", "Scifi"])
+    path = tmp_path / "books.json"
+    main(["--db", db, "export", str(path)])
+    assert "Exported 1 books" in capsys.readouterr().out
+    [book] = json.loads(path.read_text(encoding="utf-8"))
+    assert (book["title"], book["author"], book["pages"]) == ("Dune", "Frank Herbert", 412)
+
+# Unknown file types are rejected by the argument parser before the database is opened
+@pytest.mark.parametrize("command", ["import", "export"])
+def test_unsupported_file_type(tmp_path, capsys, command):
+    db = tmp_path / "library.db"
+    with pytest.raises(SystemExit) as error:
+        main(["--db", str(db), command, str(tmp_path / "books.txt")])
+    assert error.value.code == 2
+    assert "unsupported file type" in capsys.readouterr().err
+    assert not db.exists()
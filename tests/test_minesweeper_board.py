@@ -0,0 +1,125 @@
+# Imports
+import random
+import pytest
+from minesweeper_board import Board
+
+
+# The batched adjacency count gives the same numbers as counting each cell on its own
+@pytest.mark.parametrize("rows, columns, mines", [(8, 8, 10), (30, 16, 99), (1, 20, 5), (20, 1, 5)])
+def test_batched_adjacent_matches_loop(rows, columns, mines):
+    board = Board(rows, columns, mines, seed=rows * columns)
+    board.place_mine()
+    batched = bytes(board.adjacent)
+    board.calc_adjacent(batched=False)
+    assert bytes(board.adjacent) == batched
+
+# Reveal of the old recursive version on copies of the arrays, empty cells open their neighbours
+def reveal_by_recursion(board, revealed, index):
+    if revealed[index] or board.flagged[index]:
+        return
+    revealed[index] = 1
+    if board.mines[index] or board.adjacent[index]:
+        return
+    row, col = divmod(index, board.columns)
+    for n_row in range(max(row - 1, 0), min(row + 2, board.rows)):
+        for n_col in range(max(col - 1, 0), min(col + 2, board.columns)):
+            reveal_by_recursion(board, revealed, n_row * board.columns + n_col)
+
+# The flood fill opens the same cells as the recursive reveal, also around flags
+@pytest.mark.parametrize("seed", range(40))
+def test_flood_fill_matches_recursion(seed):
+    rng = random.Random(seed)
+    rows, columns = rng.randint(1, 20), rng.randint(1, 20)
+    board = Board(rows, columns, rng.randrange(rows * columns // 5 + 1), seed=seed)
+    board.place_mine()
+    for _ in range(rng.randrange(4)):
+        board.flag(*divmod(rng.randrange(board.size), columns))
+
+    for _ in range(5):
+        index = rng.randrange(board.size)
+        expected = bytearray(board.revealed)
+        reveal_by_recursion(board, expected, index)
+        before = bytes(board.revealed)
+        changed = board.reveal(*divmod(index, columns))
+        assert board.revealed == expected
+        assert sorted(changed) == [i for i in range(board.size) if expected[i] and not before[i]]
+        if board.game_over:
+            break
+
+# A board without mines opens with one click, far deeper than the recursion limit
+def test_flood_fill_large_empty_board():
+    board = Board(400, 400, 0, seed=1)
+    changed = board.reveal(200, 200)
+    assert len(changed) == board.size
+    assert board.end()
+
+# Plays random clicks and flags with check_counters on, so every reveal and flag compares the counters to a full scan
+@pytest.mark.parametrize("seed", range(20))
+def test_counters_match_full_scan(seed):
+    rng = random.Random(seed)
+    board = Board(16, 16, 40, check_counters=True, seed=seed)
+    for _ in range(500):
+        if board.game_over or board.end():
+            break
+        row, col = divmod(rng.randrange(board.size), board.columns)
+        if rng.random() < 0.2:
+            board.flag(row, col)
+        else:
+            board.reveal(row, col)
+    board.verify_counters()
+
+# Cells revealed one at a time through the cell views keep the counters right too
+def test_counters_after_cell_reveals():
+    board = Board(8, 8, 10, seed=3)
+    board.place_mine()
+    for row in board.grid:
+        for cell in row:
+            cell.reveal()
+    board.verify_counters()
+    assert board.revealed_mines == 10
+    assert board.end()
+
+def test_verify_counters_finds_wrong_counter():
+    board = Board(8, 8, 10, seed=1)
+    board.reveal(4, 4)
+    board.revealed_safe += 1
+    with pytest.raises(AssertionError):
+        board.verify_counters()
+
+# The first click and its neighbours never have mines, and the board gets exactly mine_count mines
+@pytest.mark.parametrize("seed", range(30))
+def test_first_click_is_safe(seed):
+    rng = random.Random(seed)
+    board = Board(9, 9, 10, seed=seed)
+    row, col = rng.randrange(9), rng.randrange(9)
+    board.reveal(row, col)
+    assert not board.game_over
+    assert board.mines.count(1) == 10
+    for n_row in range(max(row - 1, 0), min(row + 2, 9)):
+        for n_col in range(max(col - 1, 0), min(col + 2, 9)):
+            assert not board.mines[n_row * 9 + n_col]
+
+# A board too full for the safe area still keeps the clicked cell safe
+def test_first_click_safe_on_a_full_board():
+    board = Board(3, 3, 8, seed=2)
+    board.reveal(1, 1)
+    assert not board.game_over
+    assert board.end()
+
+def test_same_seed_same_mines():
+    first = Board(16, 16, 40, seed=77)
+    second = Board(16, 16, 40, seed=77)
+    first.reveal(3, 4)
+    second.reveal(3, 4)
+    assert first.mines == second.mines
+    other = Board(16, 16, 40, seed=78)
+    other.reveal(3, 4)
+    assert other.mines != first.mines
+
+# Without a seed a random one is picked and kept, so the board can be made again from it
+def test_random_seed_is_kept():
+    board = Board(16, 16, 40)
+    board.reveal(8, 8)
+    again = Board(16, 16, 40, seed=board.seed)
+    again.reveal(8, 8)
+    assert again.mines == board.mines
@@ -0,0 +1,73 @@
+# Imports
+import pytest
+from minesweeper_endless import EndlessBoard
+
+
+# Mines around a world cell counted one neighbour at a time from the mines of the chunks
+def count_by_hand(board, x, y):
+    size = board.chunk_size
+    count = 0
+    for n_y in (y - 1, y, y + 1):
+        for n_x in (x - 1, x, x + 1):
+            if (n_x, n_y) != (x, y):
+                count += board.chunk_mines(n_x // size, n_y // size)[(n_y % size) * size + n_x % size]
+    return count
+
+# Every cell of the chunks, the ones on the edges and corners get their counts from the neighbouring chunks
+# Mine cells have zero like on the normal board
+@pytest.mark.parametrize("cx, cy", [(0, 0), (-1, 0), (0, -1), (-1, -1), (3, -2)])
+def test_adjacent_across_chunk_edges(cx, cy):
+    board = EndlessBoard(seed=3, density=0.3, chunk_size=8)
+    chunk = board.chunk(cx, cy)
+    for local_y in range(8):
+        for local_x in range(8):
+            index = local_y * 8 + local_x
+            expected = 0 if chunk.mines[index] else count_by_hand(board, cx * 8 + local_x, cy * 8 + local_y)
+            assert chunk.adjacent[index] == expected
+
+# The same seed gives the same world whatever order the chunks are made in
+def test_chunks_do_not_depend_on_order():
+    keys = [(x, y) for x in range(-2, 3) for y in range(-2, 3)]
+    first = EndlessBoard(seed=9, chunk_size=8)
+    second = EndlessBoard(seed=9, chunk_size=8)
+    for key in keys:
+        first.chunk(*key)
+    for key in reversed(keys):
+        second.chunk(*key)
+    for key in keys:
+        assert first.chunks[key].mines == second.chunks[key].mines
+        assert first.chunks[key].adjacent == second.chunks[key].adjacent
+
+def test_start_area_is_safe():
+    for seed in range(20):
+        board = EndlessBoard(seed=seed, density=0.5, chunk_size=8)
+        changed = board.reveal(0, 0)
+        assert not board.game_over
+        assert board.revealed_safe == len(changed)
+        for x in (-1, 0, 1):
+            for y in (-1, 0, 1):
+                chunk, index = board.locate(x, y)
+                assert not chunk.mines[index]
+
+# The opened area goes over the chunk edges and stops at the numbered cells
+def test_reveal_opens_over_chunk_edges():
+    board = EndlessBoard(seed=1, density=EndlessBoard.MIN_DENSITY, chunk_size=4)
+    changed = board.reveal(0, 0)
+    assert len({(x // 4, y // 4) for x, y in changed}) > 1
+    for x, y in changed:
+        view = board.cell_view(x, y)
+        assert view != "mine"
+        if view == 0:
+            for n_y in (y - 1, y, y + 1):
+                for n_x in (x - 1, x, x + 1):
+                    assert board.cell_view(n_x, n_y) is not None
+
+def test_density_limit():
+    with pytest.raises(ValueError):
+        EndlessBoard(density=0.11)
+
+# At the lowest density the first reveal stays a few thousand cells
+def test_first_reveal_is_bounded_at_min_density():
+    for seed in range(20):
+        board = EndlessBoard(seed=seed, density=EndlessBoard.MIN_DENSITY)
+        assert len(board.reveal(0, 0)) < 10000
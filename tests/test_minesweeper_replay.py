@@ -0,0 +1,86 @@
+# Imports
+import random
+import pytest
+from minesweeper_board import Board
+from minesweeper_replay import (END, FLAG, REVEAL, ReplayWriter, read_games, replay, unzigzag,
+                                write_varint, zigzag)
+
+
+# Plays random clicks on the board and records them, returns the recorded events
+def play_and_record(board, writer, rng, max_clicks=60):
+    events = []
+    tick = 0
+    writer.start_game(board)
+    while not board.game_over and not board.end() and len(events) < max_clicks:
+        index = rng.randrange(board.size)
+        action = FLAG if rng.random() < 0.2 else REVEAL
+        tick += rng.randrange(2000)
+        writer.record(action, index, tick)
+        events.append((action, index, tick))
+        row, col = divmod(index, board.columns)
+        if action == REVEAL:
+            board.reveal(row, col)
+        else:
+            board.flag(row, col)
+    writer.end_game()
+    return events
+
+@pytest.mark.parametrize("seed", [0, 1, 12345, -1, -5, 2 ** 40, -(2 ** 40)])
+def test_round_trip(tmp_path, seed):
+    path = tmp_path / "games.msr"
+    board = Board(16, 16, 40, seed=seed)
+    writer = ReplayWriter(path)
+    events = play_and_record(board, writer, random.Random(seed))
+    writer.close()
+
+    [log] = list(read_games(path))
+    assert (log.rows, log.columns, log.mines, log.seed) == (16, 16, 40, seed)
+    assert log.events == events
+
+    result = replay(log)
+    assert result.seed == seed
+    assert result.lost == board.game_over
+    assert result.won == (board.end() and not board.game_over)
+    assert result.revealed_safe == board.revealed_safe
+
+# Several games in one file and a file appended to later come back in order
+def test_many_games_and_appending(tmp_path):
+    path = tmp_path / "games.msr"
+    seeds = [3, -7, 11]
+    for seed in seeds:
+        writer = ReplayWriter(path)
+        play_and_record(Board(8, 8, 10, seed=seed), writer, random.Random(seed))
+        writer.close()
+    assert [log.seed for log in read_games(path)] == seeds
+
+def test_zigzag():
+    assert [zigzag(value) for value in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]
+    assert all(unzigzag(zigzag(value)) == value for value in range(-1000, 1000))
+
+def test_write_varint_rejects_negative():
+    with pytest.raises(ValueError):
+        write_varint(bytearray(), -1)
+
+# Records of an unknown version are rejected instead of read as garbage
+def test_unknown_version(tmp_path):
+    path = tmp_path / "new.msr"
+    path.write_bytes(bytes([2, 8, 8, 10, 0, END]))
+    with pytest.raises(ValueError, match="version"):
+        list(read_games(path))
+
+# Logs cut in the header or after the code of a click raise the same error as a cut event
+@pytest.mark.parametrize("data", [bytes([1, 5, 5]), bytes([1]), bytes([1, 8, 8, 10, 0, 5])])
+def test_truncated_game(tmp_path, data):
+    path = tmp_path / "cut.msr"
+    path.write_bytes(data)
+    with pytest.raises(ValueError, match="middle of a game"):
+        list(read_games(path))
+
+def test_truncated_log(tmp_path):
+    path = tmp_path / "cut.msr"
+    writer = ReplayWriter(path)
+    play_and_record(Board(8, 8, 10, seed=4), writer, random.Random(4))
+    writer.close()
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        list(read_games(path))
@@ -0,0 +1,19 @@
+# Imports
+import pytest
+from minesweeper_sim import simulate
+
+
+# The games get their seeds from the batches, so the stats do not depend on how the batches are run
+@pytest.mark.parametrize("policy", ["random", "center", "solver"])
+def test_same_results_for_any_number_of_workers(policy):
+    single = simulate(60, 8, 8, 10, policy=policy, seed=5, workers=1, batch_size=7)
+    pooled = simulate(60, 8, 8, 10, policy=policy, seed=5, workers=2, batch_size=7)
+    other_batches = simulate(60, 8, 8, 10, policy=policy, seed=5, workers=1, batch_size=60)
+    assert single.summary() == pooled.summary() == other_batches.summary()
+    assert single.cascade_sizes == pooled.cascade_sizes
+    assert single.games == 60
+
+def test_different_seeds_give_different_games():
+    first = simulate(40, 8, 8, 10, seed=0, workers=1)
+    second = simulate(40, 8, 8, 10, seed=1000, workers=1)
+    assert first.cascade_sizes != second.cascade_sizes
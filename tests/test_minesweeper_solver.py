@@ -0,0 +1,61 @@
+# Imports
+import random
+from itertools import combinations
+import pytest
+from minesweeper_board import Board
+from minesweeper_solver import neighbours
+
+
+# Mine probability of every hidden cell by trying every way to place the mines that fits the numbers
+def probabilities_by_enumeration(board):
+    hidden = [index for index in range(board.size) if not board.revealed[index]]
+    numbered = [index for index in range(board.size) if board.revealed[index]]
+    around = {index: neighbours(index, board.rows, board.columns) for index in numbered}
+    counts = dict.fromkeys(hidden, 0)
+    fits = 0
+    for placement in combinations(hidden, board.mine_count):
+        placed = set(placement)
+        if all(sum(n in placed for n in around[index]) == board.adjacent[index] for index in numbered):
+            fits += 1
+            for index in placement:
+                counts[index] += 1
+    return {index: count / fits for index, count in counts.items()}
+
+# Solver probabilities and deductions agree with the enumeration on small boards
+@pytest.mark.parametrize("seed", range(30))
+def test_probabilities_match_enumeration(seed):
+    rng = random.Random(seed)
+    board = Board(4, 5, 4, seed=seed)
+    board.reveal(rng.randrange(4), rng.randrange(5))
+    solver = board.get_solver()
+    while not board.game_over and not board.end():
+        expected = probabilities_by_enumeration(board)
+        for index, chance in solver.probabilities().items():
+            assert chance == pytest.approx(expected[index])
+        for index in solver.safe_cells():
+            assert expected[index] == 0
+        for index in solver.mine_cells():
+            assert expected[index] == 1
+
+        row, col, _ = board.hint()
+        board.reveal(row, col)
+
+# Cells the solver calls certain are never wrong over whole games on the hard board
+@pytest.mark.parametrize("seed", range(10))
+def test_deductions_are_right(seed):
+    board = Board(30, 16, 99, seed=seed)
+    board.reveal(15, 8)
+    solver = board.get_solver()
+    while not board.game_over and not board.end():
+        assert not any(board.mines[index] for index in solver.safe_cells())
+        assert all(board.mines[index] for index in solver.mine_cells())
+        hint = board.hint()
+        if hint is None:
+            break
+        board.reveal(hint[0], hint[1])
+
+def test_no_hint_on_a_finished_board():
+    board = Board(4, 4, 0, seed=1)
+    board.reveal(0, 0)
+    assert board.end()
+    assert board.hint() is None
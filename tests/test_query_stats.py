@@ -0,0 +1,122 @@
+# Imports
+import time
+import pytest
+from benchmark import generate_books
+from query_stats import QueryStats
+from repo import BookRepository
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = BookRepository(tmp_path / "library.db", instrument=True, slow_ms=10000)
+    yield repository
+    repository.close()
+
+
+# Explaining a new statement is done after the call is timed
+def test_explain_not_timed(repository, monkeypatch):
+    explain = QueryStats.explain
+    def slow_explain(self, sql, params):
+        time.sleep(0.05)
+        return explain(self, sql, params)
+    monkeypatch.setattr(QueryStats, "explain", slow_explain)
+
+    repository.search(title="dune")
+    stats = repository.query_stats
+    assert stats.methods["search"]["max_ms"] < 50
+    assert any(plan for plan in stats.plans.values())
+
+# reset forgets the plans too, so they are explained again
+def test_reset_clears_plans(repository):
+    repository.search(title="dune")
+    stats = repository.query_stats
+    assert stats.plans
+    stats.reset()
+    assert (stats.methods, stats.plans, stats.scans, list(stats.slow_queries)) == ({}, {}, {}, [])
+
+# A timed method called by another timed method is part of the outer call only
+def test_nested_call_counted_once(repository):
+    repository.yearly_summary(2024)
+    methods = repository.query_stats.methods
+    assert methods["yearly_summary"]["calls"] == 1
+    assert "summary_by_year" not in methods
+
+# Statements that read the whole books table are in the full scan report, searches through the index are not
+def test_full_scans(repository):
+    repository.add_books(generate_books(50, seed=1))
+    repository.get_all_books()
+    repository.get_all_books()
+    repository.search(title="a")
+    full_scans = repository.query_stats.report()["full_scans"]
+    assert any(entry["runs"] == 2 and "FROM books" in entry["sql"] for entry in full_scans)
+    assert not any("MATCH" in entry["sql"] for entry in full_scans)
+
+# Counting every book reads the whole table through an index, it is still a full scan
+def test_count_through_index_is_full_scan(repository):
+    repository.add_books(generate_books(20, seed=3))
+    repository.count_books()
+    full_scans = repository.query_stats.report()["full_scans"]
+    assert any("COUNT(*) FROM books" in entry["sql"] for entry in full_scans)
+
+# The first page of the list reads only its LIMIT rows in rowid order, so it is not a full scan
+def test_first_page_not_full_scan(repository):
+    repository.add_books(generate_books(50, seed=4))
+    repository.search_page(limit=10)
+    stats = repository.query_stats
+    [sql] = [sql for sql in stats.plans if "LIMIT" in sql]
+    assert any(QueryStats.is_full_scan(line) for line in stats.plans[sql])
+    assert stats.report()["full_scans"] == []
+
+@pytest.mark.parametrize("sql, plan, bounded", [
+    ("SELECT books.* FROM books ORDER BY books.id LIMIT ?", ["SCAN books"], True),
+    ("SELECT * FROM books ORDER BY id\n LIMIT ?", ["SCAN books"], True),
+    ("SELECT books.* FROM books ORDER BY books.id", ["SCAN books"], False),
+    ("SELECT * FROM books ORDER BY title LIMIT ?", ["SCAN books", "USE TEMP B-TREE FOR ORDER BY"], False),
+    ("SELECT * FROM books ORDER BY id DESC LIMIT ?", ["SCAN books"], True)])
+def test_is_bounded_scan(sql, plan, bounded):
+    assert QueryStats.is_bounded_scan(sql, plan) == bounded
+
+@pytest.mark.parametrize("line, full_scan", [("SCAN books", True),
+                                             ("SCAN books USING INDEX idx_status", True),
+                                             ("SCAN books USING COVERING INDEX idx_status", True),
+                                             ("SCAN books_fts VIRTUAL TABLE INDEX 0:M1", False),
+                                             ("SEARCH books USING INTEGER PRIMARY KEY (rowid=?)", False),
+                                             ("SCAN CONSTANT ROW", False)])
+def test_is_full_scan(line, full_scan):
+    assert QueryStats.is_full_scan(line) == full_scan
+
+# The slow query log has the statements, also the ones run outside of the timed methods
+def test_slow_log_statements(repository):
+    repository.query_stats.slow_ms = 0
+    books = list(generate_books(50, seed=2))
+    repository.add_books(books)
+    repository.delete_many(book.id for book in books[:30])
+    repository.count_books()
+    list(repository.iter_books(batch_size=10))
+    slow_queries = repository.query_stats.report()["slow_queries"]
+    inserts = [entry for entry in slow_queries if entry["method"] == "add_books" and entry["sql"].startswith("INSERT")]
+    assert len(inserts) == 50
+    [delete] = [entry for entry in slow_queries if entry["method"] == "delete_many"]
+    assert delete["runs"] == 30 and delete["params"] == [books[0].id]
+    assert any(entry["sql"] == "SELECT COUNT(*) FROM books" and entry["method"] is None and entry["plan"]
+               for entry in slow_queries)
+    assert any(entry["sql"] == "SELECT books.* FROM books ORDER BY id" for entry in slow_queries)
+
+# The time of the fetches is added to the statement, so a statement goes to the log when its rows are read
+def test_fetch_time_added(repository, monkeypatch):
+    repository.add_books(generate_books(20, seed=6))
+    stats = repository.query_stats
+    stats.slow_ms = 30
+    fetchall = repository.cursor._cursor.fetchall
+    class SlowCursor:
+        def __getattr__(self, name):
+            return getattr(fetchall.__self__, name)
+        def fetchall(self):
+            time.sleep(0.05)
+            return fetchall()
+    repository.cursor._cursor = SlowCursor()
+    repository.cursor.execute("SELECT * FROM books WHERE pages > ?", (0,))
+    assert list(stats.slow_queries) == []
+    assert len(repository.cursor.fetchall()) == 20
+    [entry] = stats.slow_queries
+    assert entry["ms"] >= 50 and entry["params"] == [0]
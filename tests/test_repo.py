@@ -0,0 +1,255 @@
+# Imports
+import json
+import sqlite3
+import repo as repo_module
+import pytest
+from benchmark import generate_books
+from book import Book
+from importer import export_books, import_books
+from repo import BookRepository
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = BookRepository(tmp_path / "library.db")
+    yield repository
+    repository.close()
+
+
+# add_books gives the books the ids that sqlite picked, also after deleted rows and gaps
+def test_add_books_ids(repository):
+    repository.add_books(generate_books(5, seed=1))
+    repository.delete_book(3)
+    repository.connect.execute("INSERT INTO books (id, title, author, pages, current_page, status, genre, "
+                               "owned, date_added) VALUES (100, 'Gap', 'Author', 1, 0, 'UNREAD', 'Genre', 1, "
+                               "'2020-01-01')")
+    repository.connect.commit()
+
+    books = list(generate_books(4, seed=2))
+    repository.add_books(books)
+    assert [book.id for book in books] == [101, 102, 103, 104]
+    for book in books:
+        [stored] = repository.search(ids=[book.id])
+        assert stored.title == book.title
+
+# A big import does not keep every added id for the change event, the listeners get a reset
+def test_import_sends_reset_past_the_id_limit(repository, tmp_path, monkeypatch):
+    monkeypatch.setattr(repo_module, "MAX_CHANGED_IDS", 100)
+    path = tmp_path / "books.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for book in generate_books(1000, seed=3):
+            f.write(json.dumps({"title": book.title, "author": book.author, "pages": book.pages}) + "\n")
+
+    events = []
+    repository.subscribe(events.append)
+    seen = []
+    original = repository.add_books
+    def add_books(books):
+        original(books)
+        changes = repository._pending_changes
+        seen.append(len(changes["added"]))
+    repository.add_books = add_books
+
+    assert import_books(repository, path, chunk_size=64) == 1000
+    assert max(seen) <= 100
+    assert events == [{"added": [], "updated": [], "deleted": [], "reset": True}]
+    assert len(repository.search()) == 1000
+
+# A small write still lists the changed ids
+def test_small_write_lists_ids(repository):
+    events = []
+    repository.subscribe(events.append)
+    books = list(generate_books(3, seed=4))
+    repository.add_books(books)
+    assert events == [{"added": [book.id for book in books], "updated": [], "deleted": [], "reset": False}]
+
+# Book written for the search index tests
+def plain_book(title, author="Author", genre="Genre"):
+    return Book(title=title, author=author, pages=100, genre=genre, status="UNREAD", current_page=0,
+                date_added="2020-01-01", owned=True)
+
+def titles(books):
+    return sorted(book.title for book in books)
+
+# The triggers keep books_fts in sync when books are added, edited and deleted
+def test_search_index_follows_writes(repository):
+    book = plain_book("Lumikuningatar", author="Andersen")
+    repository.add_books([book, plain_book("Muumipeikko", author="Jansson")])
+    assert titles(repository.search(query="lumiku")) == ["Lumikuningatar"]
+
+    book.title = "Tulikuningatar"
+    repository.update(book)
+    assert repository.search(query="lumiku") == []
+    assert titles(repository.search(query="tuliku")) == ["Tulikuningatar"]
+
+    repository.delete_book(book.id)
+    assert repository.search(query="tuliku") == []
+    assert titles(repository.search(query="jansson")) == ["Muumipeikko"]
+    repository.connect.execute("INSERT INTO books_fts(books_fts, rank) VALUES ('integrity-check', 1)")
+
+# A database made before the search index gets the index filled from its books when it is opened
+def test_old_database_gets_search_index(tmp_path):
+    path = tmp_path / "library.db"
+    repository = BookRepository(path)
+    repository.add_books([plain_book("Seitsemän veljestä", author="Kivi"), plain_book("Kalevala")])
+    for name in ("books_fts_insert", "books_fts_delete", "books_fts_update"):
+        repository.connect.execute(f"DROP TRIGGER {name}")
+    repository.connect.execute("DROP TABLE books_fts")
+    repository.connect.execute("PRAGMA user_version = 0")
+    repository.connect.commit()
+    repository.close()
+
+    repository = BookRepository(path)
+    try:
+        assert titles(repository.search(query="kivi")) == ["Seitsemän veljestä"]
+        assert titles(repository.search(query="kale")) == ["Kalevala"]
+    finally:
+        repository.close()
+
+# Book read in the middle of the year
+def finished_book(year, pages=100, owned=True, rating=None):
+    return Book(title=f"Book of {year}", author="Author", pages=pages, genre="Genre", status="READ",
+                current_page=pages, date_finished=f"{year}-06-15", owned=owned, rating=rating)
+
+
+def test_summary_by_year_counts(repository):
+    repository.add_books([finished_book(2015, pages=200, rating=8),
+                          finished_book(2015, pages=100, owned=False, rating=6),
+                          finished_book(2017, pages=50)])
+    summaries = repository.summary_by_year(range(2015, 2018))
+    assert [summary["year"] for summary in summaries] == [2015, 2016, 2017]
+    assert summaries[0]["books_finished"] == 2
+    assert summaries[0]["pages_read"] == 300
+    assert summaries[0]["ownership"] == {"owned": 1, "not_owned": 1}
+    assert summaries[0]["average_rating"] == 7
+    assert summaries[1] == {"year": 2016, "books_finished": 0, "pages_read": 0,
+                            "ownership": {"owned": 0, "not_owned": 0}, "average_rating": None}
+    assert repository.yearly_summary(2017) == summaries[2]
+    assert [summary["year"] for summary in repository.summary_by_year()] == [2015, 2017]
+
+# Ranges with the same start and stop but a different step must not share the cached result
+@pytest.mark.parametrize("first, second", [(range(2010, 2020, 2), range(2010, 2020)),
+                                           (range(2010, 2020), range(2010, 2020, 2)),
+                                           (range(2019, 2009, -1), range(2010, 2020))])
+def test_summary_by_year_ranges(repository, first, second):
+    repository.add_books([finished_book(year) for year in range(2010, 2020)])
+    for years in (first, second, first):
+        summaries = repository.summary_by_year(years)
+        assert [summary["year"] for summary in summaries] == list(years)
+        assert all(summary["books_finished"] == 1 for summary in summaries)
+
+def test_summary_by_year_empty_range(repository):
+    assert repository.summary_by_year(range(2020, 2020)) == []
+
+def test_stats_cache_cleared_by_writes(repository):
+    assert repository.summary_by_year(range(2020, 2021))[0]["books_finished"] == 0
+    assert repository.get_stats()["total_books"] == 0
+    repository.add_book(finished_book(2020))
+    assert repository.summary_by_year(range(2020, 2021))[0]["books_finished"] == 1
+    assert repository.get_stats()["total_books"] == 1
+
+# yearly_avg_rating averages every rated book finished that year, summary_by_year only the books read
+def test_summary_rating_and_yearly_rating(repository):
+    repository.add_books([finished_book(2018, rating=9),
+                          Book(title="Dropped", author="Author", pages=100, genre="Genre", status="READING",
+                               current_page=20, date_finished="2018-03-01", owned=True, rating=2)])
+    assert repository.yearly_avg_rating(2018) == 5.5
+    assert repository.yearly_summary(2018)["average_rating"] == 9
+
+# The year can be given as a string like in the other yearly methods
+def test_yearly_summary_string_year(repository):
+    repository.add_book(finished_book(2024))
+    assert repository.yearly_summary("2024") == repository.yearly_summary(2024)
+    assert repository.yearly_summary("2024")["books_finished"] == 1
+
+# Pages of search_page put together are the same as one search
+@pytest.mark.parametrize("filters", [{}, {"genre": "fan"}, {"query": "ka"}])
+def test_search_page_goes_through_every_result(repository, filters):
+    repository.add_books(generate_books(1000, seed=5))
+    expected = [book.id for book in repository.search(**filters)]
+    ids = []
+    after = None
+    while True:
+        page, after = repository.search_page(**filters, limit=64, after=after)
+        ids.extend(book.id for book in page)
+        if after is None:
+            break
+    assert ids == expected
+
+# A search by more ids than old SQLite versions allow variables in a statement
+def test_search_many_ids(repository):
+    repository.add_books(generate_books(1500, seed=3))
+    repository.connect.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    ids = list(range(1, 1501))
+    assert [book.id for book in repository.search(ids=ids)] == ids
+    assert len(repository.search(genre="a", ids=ids)) == len(repository.search(genre="a"))
+    assert repository.search(ids=[]) == []
+
+# The loaded object of a book gets the values of an edited copy only when the update is saved
+def test_identity_map_updated_after_commit(repository):
+    repository.add_books(generate_books(3, seed=1))
+    [loaded] = repository.search(ids=[1])
+    assert repository.search(ids=[1])[0] is loaded
+
+    edited = loaded.copy()
+    edited.current_page = 7
+    assert loaded.current_page != 7
+    repository.update(edited)
+    assert loaded.current_page == 7
+
+    edited = loaded.copy()
+    edited.current_page = 9
+    with pytest.raises(RuntimeError):
+        with repository.transaction():
+            repository.update(edited)
+            raise RuntimeError
+    assert loaded.current_page == 7
+    assert repository.search(ids=[1])[0].current_page == 7
+
+def test_change_events(repository):
+    events = []
+    repository.subscribe(events.append)
+    books = list(generate_books(2, seed=1))
+    repository.add_books(books)
+    edited = books[0].copy()
+    edited.rating = 5
+    repository.update(edited)
+    repository.delete_book(books[1].id)
+    assert [(event["added"], event["updated"], event["deleted"]) for event in events] == [
+        ([1, 2], [], []), ([], [1], []), ([], [], [2])]
+
+
+# Listeners can read the values of the updated books from the loaded objects while they are called
+def test_loaded_books_during_change_event(repository):
+    repository.add_books(generate_books(2, seed=1))
+    [book] = repository.search(ids=[2])
+    edited = book.copy()
+    edited.title = "Edited"
+    seen = []
+    repository.subscribe(lambda changes: seen.extend(repository.loaded_books(changes["updated"])))
+    repository.update(edited)
+    assert [(loaded.id, loaded.title) for loaded in seen] == [(2, "Edited")]
+    assert repository.loaded_books([3]) == []
+
+def test_select_list_needs_columns(repository):
+    with pytest.raises(ValueError, match="No columns"):
+        list(repository.iter_books(columns=()))
+    with pytest.raises(ValueError, match="Unknown columns"):
+        list(repository.iter_books(columns=("title", "isbn")))
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".json", ".jsonl"])
+def test_export_import_round_trip(repository, tmp_path, suffix):
+    repository.add_books(generate_books(300, seed=7))
+    path = tmp_path / f"books{suffix}"
+    assert export_books(repository, path) == 300
+
+    copy = BookRepository(tmp_path / "copy.db")
+    try:
+        assert import_books(copy, path, chunk_size=64) == 300
+        fields = [field for field in Book.FIELDS if field != "id"]
+        original = [tuple(getattr(book, field) for field in fields) for book in repository.iter_books()]
+        imported = [tuple(getattr(book, field) for field in fields) for book in copy.iter_books()]
+        assert imported == original
+    finally:
+        copy.close()